@@ -0,0 +1,268 @@
+"""
+Stage timings for initial_decerelation_rate_report.ipynb on synthetic
+MotionData (synthetic_motiondata.py), so pipeline changes can be measured at
+fleet sizes we do not have data for yet.
+
+The notebook's code cells are loaded as a module, its stage functions are
+wrapped with timers and the per-vehicle pipeline is run in this process.
+Each stage reports exclusive wall time (time spent in nested stages is
+counted only once, against the nested stage) and call count; the run as a
+whole reports the process peak RSS. With --memory, tracemalloc also records
+each stage's peak allocation above what was allocated when it started
+(exclusive like the times, and it slows the run down, so keep it off when
+comparing timings).
+
+    python bench_decel_report.py --vehicles 7 --minutes 30 --scale 10
+    python bench_decel_report.py --profile prof/ --json bench_history.jsonl
+    python bench_decel_report.py --memory --scale 10
+"""
+import argparse
+import cProfile
+import contextlib
+import functools
+import io
+import json
+import pstats
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from datetime import datetime
+from pathlib import Path
+
+import synthetic_motiondata as sm
+
+
+NOTEBOOK = Path(__file__).with_name("initial_decerelation_rate_report.ipynb")
+
+# notebook function -> stage name
+STAGES = {
+    "build_trajectories_from_response": "build_trajectories",
+    "_init_pipeline_worker": "spatial_indexes",
+    "annotate_traj_with_intersection_distance": "intersection_distance",
+    "segment_conflict_windows": "conflict_windows",
+    "detect_braking_events": "braking_events",
+    "_lane_matches_at": "lane_match",
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+class StageTimer:
+    """
+    Exclusive wall time and calls per named stage. Stages may nest; the
+    outer stage's clock (and profiler) is paused while an inner one runs.
+    With profile=True each stage also gets its own cProfile.Profile. With
+    memory=True (tracemalloc must be tracing) each stage records its peak
+    traced allocation above the level at its entry, over the parts of its
+    calls not spent in nested stages.
+    """
+
+    def __init__(self, profile=False, memory=False):
+        self.profile = profile
+        self.memory = memory
+        self.stats = {}
+        self._stack = []  # [name, resumed_at, profiler, traced bytes at entry]
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            self._pause(self._stack[-1], now)
+        if name not in self.stats:
+            self.stats[name] = {"calls": 0, "seconds": 0.0,
+                                "peak_alloc_mb": 0.0 if self.memory else None,
+                                "profile": cProfile.Profile() if self.profile else None}
+        prof = self.stats[name]["profile"]
+        frame = [name, now, prof, tracemalloc.get_traced_memory()[0] if self.memory else 0]
+        self._stack.append(frame)
+        self._resume(frame)
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self._pause(frame, now)
+            self._stack.pop()
+            self.stats[name]["calls"] += 1
+            if self._stack:
+                outer = self._stack[-1]
+                outer[1] = now
+                self._resume(outer)
+
+    def _resume(self, frame):
+        if self.memory:
+            tracemalloc.reset_peak()
+        if frame[2] is not None:
+            frame[2].enable()
+
+    def _pause(self, frame, now):
+        name, resumed_at, prof, base = frame
+        if prof is not None:
+            prof.disable()
+        st = self.stats[name]
+        st["seconds"] += now - resumed_at
+        if self.memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            st["peak_alloc_mb"] = max(st["peak_alloc_mb"], (peak - base) / (1 << 20))
+
+    def wrap(self, fn, name):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        return timed
+
+
+def load_report(nb_path=NOTEBOOK, overrides=None, timer=None):
+    """
+    Execute the notebook's code cells into a fresh "decel_report" module.
+    overrides are applied right after the config cell (the one defining
+    LANE_GEOJSON), before the lane map is loaded. Cells that are empty or
+    only drive a full run are harmless here, since every other cell just
+    defines functions and tables.
+    """
+    nb = json.loads(Path(nb_path).read_text(encoding="utf-8"))
+    mod = types.ModuleType("decel_report")
+    mod.__file__ = str(nb_path)
+    sys.modules[mod.__name__] = mod  # so the process pool can pickle its functions
+    for cell in nb["cells"]:
+        if cell["cell_type"] != "code":
+            continue
+        src = "".join(cell["source"])
+        if not src.strip():
+            continue
+        setup = timer.stage("lane_map") if timer is not None and "= load_lane_map()" in src \
+            else contextlib.nullcontext()
+        with setup:
+            exec(compile(src, f"{nb_path}:cell", "exec"), mod.__dict__)
+        if "LANE_GEOJSON =" in src and overrides:
+            mod.__dict__.update(overrides)
+    return mod
+
+
+def run_bench(args):
+    timer = StageTimer(profile=args.profile is not None, memory=args.memory)
+    if args.memory:
+        tracemalloc.start()
+    overrides = {}
+    if args.lanes:
+        overrides["LANE_GEOJSON"] = args.lanes
+    if args.lane_cache:
+        overrides["LANE_ARTIFACT_DIR"] = args.lane_cache
+
+    log = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    t0 = time.perf_counter()
+    with log:
+        report = load_report(args.notebook, overrides, timer)
+        for fn_name, stage in STAGES.items():
+            setattr(report, fn_name, timer.wrap(getattr(report, fn_name), stage))
+
+    n_vehicles = args.vehicles * args.scale
+    with tempfile.TemporaryDirectory(prefix="bench_decel_") as tmp:
+        data = Path(tmp) / "motiondata.json"
+        with timer.stage("generate"):
+            records = sm.iter_motiondata(report.gis_lane_df, n_vehicles=n_vehicles,
+                                         duration_s=args.minutes * 60, hz=args.hz, seed=args.seed)
+            n_records = sm.write_motiondata_json(records, data)
+        size_mb = data.stat().st_size / 1e6
+
+        t_pipeline = time.perf_counter()
+        with log:
+            trajectories = report.build_trajectories_from_file(str(data))
+            rows = report.run_pipeline(trajectories, max_workers=args.workers)
+        pipeline_s = time.perf_counter() - t_pipeline
+
+    result = {
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "vehicles": n_vehicles,
+        "minutes": args.minutes,
+        "hz": args.hz,
+        "workers": args.workers,
+        "records": n_records,
+        "input_mb": round(size_mb, 1),
+        "points": int(sum(len(t) for t in trajectories.values())),
+        "dr_rows": len(rows),
+        "pipeline_s": round(pipeline_s, 3),
+        "wall_s": round(time.perf_counter() - t0, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "stages": {
+            name: {"calls": st["calls"], "seconds": round(st["seconds"], 4)}
+            for name, st in timer.stats.items()
+        },
+    }
+    if args.memory:
+        tracemalloc.stop()
+        for name, st in timer.stats.items():
+            result["stages"][name]["peak_alloc_mb"] = round(st["peak_alloc_mb"], 1)
+    if args.profile is not None:
+        out = Path(args.profile)
+        out.mkdir(parents=True, exist_ok=True)
+        for name, st in timer.stats.items():
+            st["profile"].dump_stats(out / f"{name}.prof")
+        result["profiles"] = str(out)
+    return result, timer
+
+
+def print_summary(result, timer, profile_top=0):
+    print(f"\n{result['vehicles']} vehicle(s) x {result['minutes']} min @ {result['hz']} Hz: "
+          f"{result['records']} records ({result['input_mb']} MB), {result['points']} points, "
+          f"{result['dr_rows']} DR rows")
+    print(f"pipeline {result['pipeline_s']:.2f} s | wall {result['wall_s']:.2f} s | "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    if result["workers"] != 1:
+        print("  (per-vehicle stages ran in worker processes and are not broken down; use --workers 1)")
+    pipeline = [s for s in result["stages"] if s not in ("generate", "lane_map")]
+    total = sum(result["stages"][s]["seconds"] for s in pipeline) or float("nan")
+    memory = any("peak_alloc_mb" in st for st in result["stages"].values())
+    print(f"  {'stage':<24} {'calls':>6} {'seconds':>9} {'share':>7}" + (f" {'peak alloc':>12}" if memory else ""))
+    for name, st in sorted(result["stages"].items(), key=lambda kv: -kv[1]["seconds"]):
+        share = f"{100 * st['seconds'] / total:6.1f}%" if name in pipeline else "      -"
+        alloc = f" {st['peak_alloc_mb']:>9.1f} MB" if memory else ""
+        print(f"  {name:<24} {st['calls']:>6} {st['seconds']:>9.3f} {share}{alloc}")
+    if profile_top:
+        for name, st in timer.stats.items():
+            if st["profile"] is None:
+                continue
+            print(f"\n--- {name}: top {profile_top} by cumulative time ---")
+            pstats.Stats(st["profile"], stream=sys.stdout).sort_stats("cumulative").print_stats(profile_top)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--vehicles", type=int, default=7)
+    ap.add_argument("--minutes", type=float, default=30.0)
+    ap.add_argument("--hz", type=int, default=sm.HZ)
+    ap.add_argument("--scale", type=int, default=1, help="multiply the vehicle count (e.g. 10 for 10x volume)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=1,
+                    help="run_pipeline max_workers; stage times are only seen in this process, so keep 1 "
+                         "for a per-stage breakdown")
+    ap.add_argument("--notebook", default=str(NOTEBOOK))
+    ap.add_argument("--lanes", help="lane GeoJSON (default: the notebook's LANE_GEOJSON)")
+    ap.add_argument("--lane-cache", help="lane artifact directory (default: the notebook's LANE_ARTIFACT_DIR)")
+    ap.add_argument("--profile", metavar="DIR", help="write one cProfile .prof file per stage to DIR")
+    ap.add_argument("--profile-top", type=int, default=0, help="print the top N functions of each stage profile")
+    ap.add_argument("--memory", action="store_true",
+                    help="trace per-stage peak allocations with tracemalloc (slows the run)")
+    ap.add_argument("--json", metavar="PATH", help="append the result as one JSON line (for tracking regressions)")
+    ap.add_argument("--verbose", action="store_true", help="show the notebook's own output")
+    args = ap.parse_args(argv)
+    if args.profile_top and args.profile is None:
+        args.profile = tempfile.mkdtemp(prefix="bench_decel_prof_")
+
+    result, timer = run_bench(args)
+    print_summary(result, timer, args.profile_top)
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Throughput benchmark for video_download.py against the local MockFleetBatch
+server, so downloader changes can be measured without the live API or a token.
+
+    python bench_video_download.py --vehicles 3 --minutes 30 --workers 8
+"""
+import argparse
+import contextlib
+import datetime as dt
+import io
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import video_download as vd
+from mock_fleet_batch import MockFleetBatch, DELIVERY_MODES
+
+
+BENCH_DAY = (2025, 11, 13)
+
+
+def point_at(mock: MockFleetBatch, out_dir: Path, pool_size: int, rate: float):
+    """Aim every video_download global at the mock server and a scratch output dir."""
+    base = mock.base_url
+    vd.API_BASE = base
+    vd.VIDEO_URL = f"{base}/v1/video"
+    vd.DL_URL = f"{base}/v1/download"
+    vd.CLIENT.close()
+    vd.CLIENT = vd.FleetBatchClient(pool_size=pool_size, api_base=base)
+    vd.configure_rate_limiter(rate=rate, burst=rate, max_rate=rate * 4, min_rate=min(vd.RATE_MIN, rate))
+    vd.OUTPUT_DIR = out_dir
+    vd.BUCKETS.reset()
+    with vd._MANIFEST_LOCK:
+        if vd._MANIFEST is not None:
+            vd._MANIFEST.close()
+        vd._MANIFEST = None
+
+
+def _pct(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[idx]
+
+
+def run_case(name, mock, fn, verbose=False):
+    """Run fn() once and return a summary dict built from its result and the mock's counters."""
+    mock.reset_stats()
+    t0 = time.perf_counter()
+    sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with sink:
+        result = fn()
+    wall = time.perf_counter() - t0
+
+    if isinstance(result, dict):
+        slots = sum(sum(s.values()) for s in result.values())
+        saved = sum(s["saved"] for s in result.values())
+    else:
+        samples, segments = result
+        slots, saved = len(samples), 0
+
+    stats = mock.stats
+    mb = stats["bytes_sent"] / 1e6
+    return {
+        "case": name,
+        "wall_s": wall,
+        "slots": slots,
+        "saved": saved,
+        "slots_per_s": slots / wall if wall else float("nan"),
+        "mb": mb,
+        "mb_per_s": mb / wall if wall else float("nan"),
+        "requests": dict(sorted(stats["requests"].items())),
+        "latency_ms": {
+            ep: (1000 * _pct(v, 50), 1000 * _pct(v, 99))
+            for ep, v in sorted(stats["latency"].items())
+        },
+    }
+
+
+def print_summary(row):
+    print(f"\n--- {row['case']} ---")
+    print(f"wall {row['wall_s']:.2f} s | slots {row['slots']} ({row['slots_per_s']:.1f}/s)"
+          f" | saved {row['saved']} | {row['mb']:.1f} MB ({row['mb_per_s']:.1f} MB/s)")
+    for ep, n in row["requests"].items():
+        p50, p99 = row["latency_ms"].get(ep, (float("nan"), float("nan")))
+        print(f"  {ep:<22} {n:>7} req   p50 {p50:8.1f} ms   p99 {p99:8.1f} ms")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--vehicles", type=int, default=3)
+    ap.add_argument("--minutes", type=int, default=30, help="length of the pulled window")
+    ap.add_argument("--scan-hours", type=int, default=24, help="length of the availability scan")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--per-vehicle", type=int, default=vd.PER_VEHICLE_WORKERS)
+    ap.add_argument("--segments", type=int, default=1)
+    ap.add_argument("--mode", choices=DELIVERY_MODES, default="redirect")
+    ap.add_argument("--payload-mb", type=float, default=2.0)
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--ready-delay", type=float, default=0.0)
+    ap.add_argument("--throttle-every", type=int, default=0)
+    ap.add_argument("--rate", type=float, default=200.0, help="initial RATE_LIMITER rate (req/s)")
+    ap.add_argument("--cases", default="pull_seq,pull_conc,grab_window,scan,scan_adaptive")
+    ap.add_argument("--verbose", action="store_true", help="show video_download's own log lines")
+    args = ap.parse_args(argv)
+
+    mock = MockFleetBatch(latency_sec=args.latency_ms / 1000, ready_delay_sec=args.ready_delay,
+                          mode=args.mode, payload_bytes=int(args.payload_mb * 1e6),
+                          throttle_every=args.throttle_every)
+    mock.start()
+    vd.DOWNLOAD_SEGMENTS = args.segments
+
+    vehicles = [f"veh{i}" for i in range(args.vehicles)]
+    camera = vd.CAMERA
+    start_ts = int(dt.datetime(*BENCH_DAY, tzinfo=dt.UTC).timestamp())
+    total_s = args.minutes * 60
+
+    cases = {
+        "pull_seq": lambda: vd.pull_videos("bench", vehicles, camera, start_ts, total_s),
+        "pull_conc": lambda: vd.pull_videos("bench", vehicles, camera, start_ts, total_s,
+                                            max_workers=args.workers,
+                                            per_vehicle_workers=args.per_vehicle),
+        "grab_window": lambda: vd.grab_window("bench", vehicles, camera, *BENCH_DAY,
+                                              duration_hours=0, duration_minutes=args.minutes,
+                                              max_workers=args.workers,
+                                              per_vehicle_workers=args.per_vehicle),
+        "scan": lambda: vd.scan_availability("bench", vehicles[0], camera, start_ts,
+                                             start_ts + args.scan_hours * 3600),
+        "scan_adaptive": lambda: vd.scan_availability_adaptive("bench", vehicles[0], camera, start_ts,
+                                                               start_ts + args.scan_hours * 3600),
+    }
+
+    print(f"mock at {mock.base_url} | mode={args.mode} payload={args.payload_mb} MB "
+          f"latency={args.latency_ms} ms ready_delay={args.ready_delay} s | "
+          f"{args.vehicles} vehicle(s) x {args.minutes} min, workers={args.workers}, segments={args.segments}")
+
+    rows = []
+    try:
+        for name in args.cases.split(","):
+            name = name.strip()
+            if name not in cases:
+                raise SystemExit(f"unknown case {name!r}; choose from {', '.join(cases)}")
+            with tempfile.TemporaryDirectory(prefix="bench_vd_") as tmp:
+                point_at(mock, Path(tmp), pool_size=max(32, args.workers * 2), rate=args.rate)
+                row = run_case(name, mock, cases[name], verbose=args.verbose)
+            print_summary(row)
+            rows.append(row)
+    finally:
+        mock.stop()
+    return rows
+
+
+if __name__ == "__main__":
+    main()
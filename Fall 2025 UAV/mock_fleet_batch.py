@@ -0,0 +1,266 @@
+import json
+import time
+import threading
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+
+
+ROSBAG_MAGIC = b"#ROSBAG V2.0\n"
+BLOCK_BYTES = 1 << 16
+
+DELIVERY_MODES = ("redirect", "url_body", "json_url", "binary", "url_text_ranged", "json_url_ranged")
+
+
+class MockFleetBatch:
+    """
+    Local stand-in for the fleet-batch /v1/video and /v1/download endpoints.
+
+    - latency_sec: extra delay before every /v1/video answer
+    - period_windows / on_windows: each vehicle has video for on_windows
+      consecutive 30 s windows out of every period_windows (404 otherwise),
+      with a per-vehicle phase so the gaps do not line up
+    - ready_delay_sec: /v1/download answers 404 until this long after the
+      matching /v1/video request
+    - mode: how a ready bag is delivered
+        "redirect"  302 to /blob/<name>
+        "url_body"  200 octet-stream whose body is the presigned URL
+        "json_url"  200 {"url": ...}
+        "binary"    200 with the bag bytes straight from /v1/download
+        "url_text_ranged" / "json_url_ranged"
+                    text/plain URL / {"url": ...} bodies that honour Range,
+                    so a ranged request gets a 206 slice of the body
+    - payload_bytes: bag size; bags start with the rosbag magic and are
+      deterministic, so ranged and full downloads return the same bytes
+    - throttle_every: answer every Nth API request with 429 + Retry-After (0 = never)
+    Request counts and per-endpoint handler latencies are kept in self.stats.
+    """
+
+    def __init__(self, latency_sec: float = 0.0, period_windows: int = 40,
+                 on_windows: int = 30, ready_delay_sec: float = 0.0,
+                 mode: str = "redirect", payload_bytes: int = 2_000_000,
+                 throttle_every: int = 0, host: str = "127.0.0.1", port: int = 0):
+        if mode not in DELIVERY_MODES:
+            raise ValueError(f"mode must be one of {DELIVERY_MODES}")
+        self.latency_sec = latency_sec
+        self.period_windows = period_windows
+        self.on_windows = on_windows
+        self.ready_delay_sec = ready_delay_sec
+        self.mode = mode
+        self.payload_bytes = payload_bytes
+        self.throttle_every = throttle_every
+        self._requested = {}  # filename -> time of the /v1/video request
+        self._lock = threading.Lock()
+        self._api_calls = 0
+        self.stats = {"requests": {}, "latency": {}, "bytes_sent": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-fleet-batch", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"requests": {}, "latency": {}, "bytes_sent": 0}
+
+    # ---- simulated data -------------------------------------------------
+
+    def has_video(self, vehicle: str, start_ts: int) -> bool:
+        phase = int(hashlib.sha1(vehicle.encode()).hexdigest(), 16) % self.period_windows
+        return (start_ts // 30 + phase) % self.period_windows < self.on_windows
+
+    def payload(self, name: str, start: int = 0, end: int | None = None):
+        """Yield bytes [start, end] of the bag called name in BLOCK_BYTES chunks."""
+        end = self.payload_bytes - 1 if end is None else min(end, self.payload_bytes - 1)
+        seed = hashlib.sha256(name.encode()).digest()
+        block = (seed * (BLOCK_BYTES // len(seed) + 1))[:BLOCK_BYTES]
+        pos = start
+        while pos <= end:
+            if pos < len(ROSBAG_MAGIC):
+                chunk = ROSBAG_MAGIC[pos:]
+            else:
+                off = pos % BLOCK_BYTES
+                chunk = block[off:]
+            chunk = chunk[:end + 1 - pos]
+            yield chunk
+            pos += len(chunk)
+
+    # ---- bookkeeping ----------------------------------------------------
+
+    def _record(self, endpoint: str, seconds: float, nbytes: int = 0):
+        with self._lock:
+            self.stats["requests"][endpoint] = self.stats["requests"].get(endpoint, 0) + 1
+            self.stats["latency"].setdefault(endpoint, []).append(seconds)
+            self.stats["bytes_sent"] += nbytes
+
+    def _should_throttle(self) -> bool:
+        if not self.throttle_every:
+            return False
+        with self._lock:
+            self._api_calls += 1
+            return self._api_calls % self.throttle_every == 0
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self._dispatch(head=True)
+
+            def do_GET(self):
+                self._dispatch(head=False)
+
+            def _dispatch(self, head):
+                t0 = time.perf_counter()
+                url = urlsplit(self.path)
+                q = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path.startswith("/v1/") and mock._should_throttle():
+                    self._send(429, b"slow down", "text/plain", head, extra={"Retry-After": "1"})
+                    endpoint, sent = "429", 0
+                elif url.path == "/v1/video":
+                    endpoint, sent = "/v1/video", self._video(q, head)
+                elif url.path == "/v1/download":
+                    endpoint, sent = "/v1/download", self._download(q, head)
+                elif url.path.startswith("/blob/"):
+                    endpoint, sent = "/blob", self._blob(unquote(url.path[len("/blob/"):]), head)
+                else:
+                    self._send(404, b"not found", "text/plain", head)
+                    endpoint, sent = "other", 0
+                mock._record(f"{'HEAD' if head else 'GET'} {endpoint}", time.perf_counter() - t0, sent)
+
+            def _send(self, code, body: bytes, ctype, head, extra=None):
+                self.send_response(code)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (extra or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                if not head:
+                    self.wfile.write(body)
+                return 0 if head else len(body)
+
+            def _video(self, q, head):
+                if mock.latency_sec:
+                    time.sleep(mock.latency_sec)
+                try:
+                    vehicle = q["vehicle"]
+                    camera = q["camera"]
+                    start_ts = int(q["startTime"])
+                    end_ts = int(q["endTime"])
+                except (KeyError, ValueError):
+                    return self._send(400, b"bad request", "text/plain", head)
+                if not mock.has_video(vehicle, start_ts):
+                    return self._send(404, b"No video found for the requested window", "text/plain", head)
+                name = f"{vehicle}_{camera}_{start_ts}_{end_ts}.bag"
+                with mock._lock:
+                    mock._requested.setdefault(name, time.monotonic())
+                return self._send(200, json.dumps({"filename": name}).encode(), "application/json", head)
+
+            def _download(self, q, head):
+                name = q.get("filename", "")
+                with mock._lock:
+                    t_req = mock._requested.get(name)
+                if t_req is None or time.monotonic() - t_req < mock.ready_delay_sec:
+                    return self._send(404, b"not ready", "text/plain", head)
+                if head:
+                    # readiness probe: the real API answers HEAD with 200 once the bag exists
+                    return self._send(200, b"", "application/octet-stream", head)
+                blob_url = f"{mock.base_url}/blob/{quote(name)}"
+                if mock.mode == "redirect":
+                    return self._send(302, b"", "text/plain", head, extra={"Location": blob_url})
+                if mock.mode == "url_body":
+                    return self._send(200, blob_url.encode(), "application/octet-stream", head)
+                if mock.mode == "json_url":
+                    return self._send(200, json.dumps({"url": blob_url}).encode(), "application/json", head)
+                if mock.mode == "url_text_ranged":
+                    return self._ranged_body(blob_url.encode(), "text/plain", head)
+                if mock.mode == "json_url_ranged":
+                    return self._ranged_body(json.dumps({"url": blob_url}).encode(), "application/json", head)
+                return self._bytes(name, head)
+
+            def _ranged_body(self, body, ctype, head):
+                rng = self.headers.get("Range")
+                if not (rng and rng.startswith("bytes=")):
+                    return self._send(200, body, ctype, head)
+                a, _, b = rng[len("bytes="):].partition("-")
+                start = int(a) if a else 0
+                end = min(int(b), len(body) - 1) if b else len(body) - 1
+                return self._send(206, body[start:end + 1], ctype, head,
+                                  extra={"Content-Range": f"bytes {start}-{end}/{len(body)}"})
+
+            def _blob(self, name, head):
+                return self._bytes(name, head)
+
+            def _bytes(self, name, head):
+                total = mock.payload_bytes
+                start, end = 0, total - 1
+                rng = self.headers.get("Range")
+                if rng and rng.startswith("bytes="):
+                    a, _, b = rng[len("bytes="):].partition("-")
+                    start = int(a) if a else 0
+                    end = min(int(b), total - 1) if b else total - 1
+                    if start >= total:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{total}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return 0
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(end - start + 1))
+                self.end_headers()
+                if head:
+                    return 0
+                sent = 0
+                try:
+                    for chunk in mock.payload(name, start, end):
+                        self.wfile.write(chunk)
+                        sent += len(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                return sent
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Run the mock fleet-batch API until interrupted.")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--mode", choices=DELIVERY_MODES, default="redirect")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--ready-delay", type=float, default=0.0)
+    ap.add_argument("--payload-mb", type=float, default=2.0)
+    args = ap.parse_args()
+
+    mock = MockFleetBatch(latency_sec=args.latency_ms / 1000, ready_delay_sec=args.ready_delay,
+                          mode=args.mode, payload_bytes=int(args.payload_mb * 1e6), port=args.port)
+    print(f"mock fleet-batch listening on {mock.start()} (mode={args.mode})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
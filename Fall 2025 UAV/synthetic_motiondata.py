@@ -0,0 +1,240 @@
+"""
+Synthetic MotionData for load-testing initial_decerelation_rate_report.ipynb
+without the history API.
+
+Vehicles drive along chains of connected "Lane Nominal" lanes at HZ samples
+per second. Before some intersection lanes they brake to a stop, wait, and
+pull away again. The records have the getHistoryData shape: Chid, Time and a
+Json payload carrying Speed / TELE_OP_OBJECTS.vel, POSE.Acc, Brake /
+isBrakeCmdActive, Latitude / Longitude and TrafficLights.
+
+    python synthetic_motiondata.py ca-martinez-carquinez_Oct8th2024.geojson \
+        --vehicles 7 --minutes 60 -o motiondata_synth.json
+"""
+import argparse
+import json
+from datetime import datetime, timedelta
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from pyproj import Transformer
+
+
+HZ = 10
+FIRST_CHID = 19200
+START = datetime(2025, 11, 13, 2, 0, 0)
+
+CRUISE_MPS = (8.0, 14.0)        # per-vehicle cruise speed range
+STOP_PROB = 0.5                 # chance of stopping before an intersection lane
+BRAKE_MPS2 = (1.2, 3.5)         # comfortable braking rate range for a stop
+DWELL_S = (2.0, 20.0)           # time stood at the stop line
+MAX_ACCEL_MPS2 = 1.5
+CONNECT_M = 1.5                 # a lane follows another if it starts this close to its end
+GPS_NOISE_M = 0.3
+SPEED_ONLY_VEL_PROB = 0.1       # records with TELE_OP_OBJECTS.vel but no Speed
+MISSING_ACC_PROB = 0.02         # records without POSE.Acc
+SIGNAL_TYPES = (1, 2, 4)        # REAL_SIGNAL_TYPES in the report
+
+
+def load_lanes(path):
+    """Lane GeoJSON -> 2D "Lane Nominal" LineStrings in EPSG:26910 (same prep as the report)."""
+    lanes = gpd.read_file(path)
+    lanes = lanes.loc[lanes["type_names"] == "Lane Nominal"].copy()
+    lanes["geometry"] = shapely.force_2d(lanes.geometry.values)
+    return lanes.to_crs(epsg=26910)
+
+
+class LaneNetwork:
+    """Drivable LineStrings of a projected lane GeoDataFrame and which lane can follow which."""
+
+    def __init__(self, lanes_gdf):
+        geoms = lanes_gdf.geometry.values
+        ok = (shapely.get_type_id(geoms) == 1) & (shapely.length(geoms) > 0.5)
+        self.crs = lanes_gdf.crs
+        self.geoms = geoms[ok]
+        self.lengths = shapely.length(self.geoms)
+        self.is_intersection = (
+            lanes_gdf["semantic_description"].astype(str).str.lower().to_numpy()[ok] == "intersection"
+        )
+        if not len(self.geoms):
+            raise ValueError("no drivable lanes")
+
+        starts = shapely.get_point(self.geoms, 0)
+        ends = shapely.get_point(self.geoms, -1)
+        end_idx, start_idx = shapely.STRtree(starts).query(ends, predicate="dwithin", distance=CONNECT_M)
+        keep = end_idx != start_idx
+        end_idx, start_idx = end_idx[keep], start_idx[keep]
+        order = np.argsort(end_idx, kind="stable")
+        self._succ = np.split(start_idx[order], np.searchsorted(end_idx[order], np.arange(1, len(self.geoms))))
+
+    def successors(self, lane):
+        return self._succ[lane]
+
+
+def simulate_vehicle(net, n_steps, rng, hz=HZ):
+    """
+    One vehicle's kinematics at hz: (lane, offset, speed, accel, braking)
+    arrays. A vehicle that runs out of connected lanes re-enters on a random
+    lane, which shows up as a GPS jump like a relocalisation would.
+    """
+    dt = 1.0 / hz
+    lane_at = np.empty(n_steps, dtype=np.int64)
+    s_at = np.empty(n_steps)
+    v_at = np.empty(n_steps)
+    a_at = np.empty(n_steps)
+    braking = np.zeros(n_steps, dtype=bool)
+
+    cruise = rng.uniform(*CRUISE_MPS)
+    lane = int(rng.integers(len(net.geoms)))
+    s = rng.uniform(0, net.lengths[lane])
+    v = rng.uniform(0.5, 1.0) * cruise
+
+    def pick_next(cur):
+        succ = net.successors(cur)
+        return int(rng.choice(succ)) if len(succ) else -1
+
+    nxt = pick_next(lane)
+    stop_here = nxt >= 0 and net.is_intersection[nxt] and rng.random() < STOP_PROB
+    brake_rate = rng.uniform(*BRAKE_MPS2)
+    stopping, dwell = False, 0
+
+    for k in range(n_steps):
+        to_end = net.lengths[lane] - s
+        if dwell > 0:
+            a, dwell = 0.0, dwell - 1
+            if dwell == 0:
+                stop_here = stopping = False
+        elif stopping or (stop_here and v * v >= 2.0 * brake_rate * max(to_end, 0.1)):
+            # constant decel that ends at the stop line, once committed
+            stopping = True
+            a = -min(v * v / (2.0 * max(to_end, 0.1)), 6.0)
+            braking[k] = True
+            if v + a * dt <= 0.05:
+                a, dwell = -v / dt, max(1, int(rng.uniform(*DWELL_S) * hz))
+        else:
+            a = float(np.clip(0.5 * (cruise - v), -1.0, MAX_ACCEL_MPS2))
+
+        v = max(0.0, v + a * dt)
+        s = min(s + v * dt, net.lengths[lane]) if stop_here else s + v * dt
+        while s >= net.lengths[lane] and not stop_here:
+            s -= net.lengths[lane]
+            if nxt < 0:
+                lane = int(rng.integers(len(net.geoms)))
+                s = 0.0
+            else:
+                lane = nxt
+            nxt = pick_next(lane)
+            stop_here = nxt >= 0 and net.is_intersection[nxt] and rng.random() < STOP_PROB
+            brake_rate = rng.uniform(*BRAKE_MPS2)
+
+        lane_at[k], s_at[k], v_at[k], a_at[k] = lane, s, v, a
+
+    return lane_at, s_at, v_at, a_at, braking
+
+
+def iter_motiondata(lanes_gdf, n_vehicles=7, duration_s=3600, hz=HZ, start=START,
+                    first_chid=FIRST_CHID, seed=0):
+    """
+    Yield getHistoryData-style records for n_vehicles driving for duration_s,
+    interleaved in time order like the API returns them. Kinematics are
+    simulated up front as arrays; the per-record Json strings are built
+    lazily so large runs can be streamed to disk.
+    """
+    rng = np.random.default_rng(seed)
+    net = LaneNetwork(lanes_gdf)
+    to_wgs84 = Transformer.from_crs(net.crs, "EPSG:4326", always_xy=True)
+    n_steps = int(duration_s * hz)
+
+    vehicles = []
+    for _ in range(n_vehicles):
+        lane, s, v, a, braking = simulate_vehicle(net, n_steps, rng, hz)
+        pts = shapely.line_interpolate_point(net.geoms[lane], s)
+        x, y = shapely.get_x(pts), shapely.get_y(pts)
+        # lateral accel from heading changes, so POSE.Acc is not purely longitudinal
+        heading = np.unwrap(np.arctan2(np.gradient(y), np.gradient(x)))
+        a_lat = np.clip(v * np.gradient(heading) * hz, -3.0, 3.0)
+        lon, lat = to_wgs84.transform(x + rng.normal(0, GPS_NOISE_M, n_steps),
+                                      y + rng.normal(0, GPS_NOISE_M, n_steps))
+        # a light is in view on intersection lanes and on the lanes leading into them
+        change = np.flatnonzero(lane[1:] != lane[:-1]) + 1
+        after = np.searchsorted(change, np.arange(n_steps), side="right")
+        next_lane = np.where(after < len(change), lane[change[np.minimum(after, len(change) - 1)]], lane) \
+            if len(change) else lane
+        vehicles.append({
+            "lat": lat, "lon": lon, "v": v, "braking": braking,
+            "acc": a + rng.normal(0, 0.05, n_steps),
+            "a_lat": a_lat,
+            "a_z": rng.normal(0, 0.05, n_steps),
+            "has_speed": rng.random(n_steps) >= SPEED_ONLY_VEL_PROB,
+            "has_acc": rng.random(n_steps) >= MISSING_ACC_PROB,
+            "light": net.is_intersection[lane] | net.is_intersection[next_lane],
+            "signal": np.where(braking | (v < 0.1), 1, rng.choice([2, 3], n_steps)),
+            "signal_type": rng.choice(SIGNAL_TYPES, n_steps),
+            "jitter_us": rng.integers(-5000, 5000, n_steps),
+        })
+
+    base_us = (start - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+    step_us = 1_000_000 // hz
+    for k in range(n_steps):
+        for c, veh in enumerate(vehicles):
+            t_us = base_us + k * step_us + int(veh["jitter_us"][k])
+            v = float(veh["v"][k])
+            acc = float(veh["acc"][k])
+            content = {
+                "Latitude": float(veh["lat"][k]),
+                "Longitude": float(veh["lon"][k]),
+                "TELE_OP_OBJECTS": {"vel": [v, 0.0, 0.0]},
+                "Brake": round(min(1.0, max(0.0, -acc / 6.0)), 3) if veh["braking"][k] else 0.0,
+                "isBrakeCmdActive": bool(veh["braking"][k]),
+            }
+            if veh["has_speed"][k]:
+                content["Speed"] = v
+            if veh["has_acc"][k]:
+                content["POSE"] = {"Acc": [acc, float(veh["a_lat"][k]), float(veh["a_z"][k])]}
+            if veh["light"][k]:
+                content["TrafficLights"] = [{
+                    "Signal": int(veh["signal"][k]),
+                    "SignalType": int(veh["signal_type"][k]),
+                    "UTime": t_us,
+                }]
+            t = datetime(1970, 1, 1) + timedelta(microseconds=t_us)
+            yield {
+                "Chid": first_chid + c,
+                "Time": t.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3],
+                "Json": json.dumps(content, separators=(",", ":")),
+            }
+
+
+def write_motiondata_json(records, path):
+    """Stream records to path as a {"Response": [...]} document; returns the record count."""
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"Response": [')
+        for rec in records:
+            f.write(",\n" if n else "\n")
+            f.write(json.dumps(rec, separators=(",", ":")))
+            n += 1
+        f.write("\n]}\n")
+    return n
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("lanes", help="lane GeoJSON (e.g. ca-martinez-carquinez_Oct8th2024.geojson)")
+    ap.add_argument("--vehicles", type=int, default=7)
+    ap.add_argument("--minutes", type=float, default=60.0)
+    ap.add_argument("--hz", type=int, default=HZ)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-o", "--output", default="motiondata_synth.json")
+    args = ap.parse_args(argv)
+
+    lanes = load_lanes(args.lanes)
+    records = iter_motiondata(lanes, n_vehicles=args.vehicles, duration_s=args.minutes * 60,
+                              hz=args.hz, seed=args.seed)
+    n = write_motiondata_json(records, args.output)
+    print(f"wrote {n} records for {args.vehicles} vehicle(s) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
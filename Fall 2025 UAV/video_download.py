@@ -2,6 +2,11 @@ import os
 import datetime as dt
 import time
 import json
+import re
+import hashlib
+import email.utils
+from urllib.parse import urlsplit
+import sqlite3
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -9,6 +14,13 @@ import pathlib
 from pathlib import Path
 from zoneinfo import ZoneInfo
 import random
+import threading
+import asyncio
+import contextlib
+import itertools
+import contextvars
+from collections import namedtuple, defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait, as_completed
 import matplotlib.pyplot as plt
 
 
@@ -22,14 +34,174 @@ STEP_SECONDS = 30
 THROTTLE_SEC = 0.2
 DAY_TZ = dt.UTC
 SKIP_ON_404_SEC = 300
+SCAN_COARSE_SEC = 600
 LOOKBACK_S = 5 * 24 * 3600     
 MAX_FILES_PER_VEHICLE = None 
 MIN_VALID_BYTES = 1_000_000
 MAX_OUTPUT_BYTES = 10 * 1024**3
 BUCKET_PREFIX = "download"
+MAX_WORKERS = 8
+PER_VEHICLE_WORKERS = 2
+ASYNC_READINESS = True
+READY_HEAD_WORKERS = 4
+MAX_PENDING_READY = 256
+POOL_SIZE = 32
+RETRY_TOTAL = 3
+RETRY_BACKOFF_SEC = 0.5
+RETRY_STATUSES = (429, 502, 503, 504)
+RATE_INITIAL = 5.0
+RATE_BURST = 5.0
+RATE_MIN = 0.5
+RATE_MAX = 50.0
+RATE_INCREASE = 0.5
+RATE_DECREASE = 0.5
+RATE_LATENCY_FACTOR = 3.0
+RESUME_ATTEMPTS = 3
+DOWNLOAD_SEGMENTS = 1
+SEGMENT_MIN_BYTES = 8 * 1024**2
+PROBE_BYTES = 4096  # first bytes asked of /v1/download to tell URL bodies from bag bytes
+USE_MANIFEST = True
+MANIFEST_NAME = "manifest.sqlite"
+MANIFEST_SKIP_STATUSES = ("saved", "404", "tiny")
+MANIFEST_MISS_TTL_SEC = 6 * 3600  # "404" rows are re-probed once older than this (None = never)
+MANIFEST_RESCAN = False  # True re-probes every slot that is not a saved bag on disk
+ROSBAG_MAGIC = b"#ROSBAG V2.0\n"
+REQUIRE_ROSBAG_MAGIC = False  # True discards bodies without ROSBAG_MAGIC instead of only warning
+# Opt-in: identical bags become hardlinks into OUTPUT_DIR/CAS_DIR_NAME. Deleting a
+# bucket then frees nothing until sweep_cas() drops the store entries left unlinked.
+DEDUPE_BAGS = False
+CAS_DIR_NAME = ".cas"
 
 OUTPUT_DIR = pathlib.Path("downloads")
 
+_CURRENT_VEHICLE = contextvars.ContextVar("video_download_vehicle", default=None)
+
+class JsonLinesSink:
+    """Metrics sink that appends every event as one JSON line to a path or open text stream."""
+
+    def __init__(self, target):
+        self._own = isinstance(target, (str, Path))
+        self._fh = open(target, "a", buffering=1) if self._own else target
+        self._lock = threading.Lock()
+
+    def __call__(self, event: dict):
+        line = json.dumps(event, separators=(",", ":"))
+        with self._lock:
+            self._fh.write(line + "\n")
+
+    def close(self):
+        if self._own:
+            self._fh.close()
+
+class DownloadMetrics:
+    """
+    Per-stage timers, counters and byte totals, aggregated per vehicle.
+    Stages: "video" (/v1/video), "ready" (readiness polling), "resolve"
+    (presigned-URL / binary-response lookup) and "transfer" (bytes to disk).
+    Every observation is also passed as a dict to each sink added with
+    add_sink (e.g. JsonLinesSink); export with summary() or prometheus_text().
+    The vehicle defaults to the one bound by the slot currently running on
+    this thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sinks = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stage_sec = defaultdict(float)   # (vehicle, stage) -> seconds
+            self.stage_calls = defaultdict(int)   # (vehicle, stage) -> calls
+            self.counters = defaultdict(int)      # (vehicle, name) -> count
+            self.bytes = defaultdict(int)         # vehicle -> bytes written
+            self.started = time.time()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def _emit(self, event):
+        for sink in list(self.sinks):
+            try:
+                sink(event)
+            except Exception as e:
+                print(f"[WARN] metrics sink {sink!r} failed: {e}")
+
+    @contextlib.contextmanager
+    def stage(self, stage: str, vehicle: str | None = None):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0, vehicle)
+
+    def observe(self, stage: str, seconds: float, vehicle: str | None = None):
+        vehicle = vehicle if vehicle is not None else _CURRENT_VEHICLE.get()
+        with self._lock:
+            self.stage_sec[(vehicle, stage)] += seconds
+            self.stage_calls[(vehicle, stage)] += 1
+        self._emit({"ts": time.time(), "type": "stage", "stage": stage,
+                    "vehicle": vehicle, "seconds": round(seconds, 6)})
+
+    def count(self, name: str, n: int = 1, vehicle: str | None = None):
+        vehicle = vehicle if vehicle is not None else _CURRENT_VEHICLE.get()
+        with self._lock:
+            self.counters[(vehicle, name)] += n
+        self._emit({"ts": time.time(), "type": "count", "name": name, "vehicle": vehicle, "n": n})
+
+    def add_bytes(self, n: int, vehicle: str | None = None):
+        vehicle = vehicle if vehicle is not None else _CURRENT_VEHICLE.get()
+        with self._lock:
+            self.bytes[vehicle] += n
+        self._emit({"ts": time.time(), "type": "bytes", "vehicle": vehicle, "n": n})
+
+    def summary(self) -> str:
+        """Seconds per stage per vehicle, plus outcome counts and MB written."""
+        stages = ("video", "ready", "resolve", "transfer")
+        with self._lock:
+            vehicles = sorted({v for v, _ in self.stage_sec} | {v for v, _ in self.counters}
+                              | set(self.bytes), key=lambda v: (v is None, str(v)))
+            lines = [f"{'vehicle':<14}" + "".join(f"{s:>11}" for s in stages)
+                     + f"{'saved':>7}{'miss':>6}{'skip':>6}{'MB':>9}"]
+            for v in vehicles:
+                row = f"{str(v or '-'):<14}"
+                row += "".join(f"{self.stage_sec.get((v, s), 0.0):>10.1f}s" for s in stages)
+                row += "".join(f"{self.counters.get((v, c), 0):>{w}}"
+                               for c, w in (("saved", 7), ("miss", 6), ("skip", 6)))
+                row += f"{self.bytes.get(v, 0) / 1e6:>9.1f}"
+                lines.append(row)
+        lines.append(f"(stage times are summed over concurrent slots; wall {time.time() - self.started:.1f}s)")
+        return "\n".join(lines)
+
+    def prometheus_text(self) -> str:
+        """Current totals in the Prometheus text exposition format."""
+        def esc(v):
+            # label values escape backslash, double quote and newline
+            return str("" if v is None else v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        def lbl(**kv):
+            return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in kv.items()) + "}"
+
+        out = []
+        with self._lock:
+            out.append("# TYPE video_download_stage_seconds_total counter")
+            for (v, s), sec in sorted(self.stage_sec.items(), key=str):
+                out.append(f"video_download_stage_seconds_total{lbl(vehicle=v, stage=s)} {sec:.6f}")
+            out.append("# TYPE video_download_stage_calls_total counter")
+            for (v, s), n in sorted(self.stage_calls.items(), key=str):
+                out.append(f"video_download_stage_calls_total{lbl(vehicle=v, stage=s)} {n}")
+            out.append("# TYPE video_download_events_total counter")
+            for (v, name), n in sorted(self.counters.items(), key=str):
+                out.append(f"video_download_events_total{lbl(vehicle=v, event=name)} {n}")
+            out.append("# TYPE video_download_bytes_total counter")
+            for v, n in sorted(self.bytes.items(), key=str):
+                out.append(f"video_download_bytes_total{lbl(vehicle=v)} {n}")
+        return "\n".join(out) + "\n"
+
+
+METRICS = DownloadMetrics()
+
 def _highest_bucket_idx(vehicle_dir: Path) -> int:
     if not vehicle_dir.exists():
         return 0
@@ -43,26 +215,6 @@ def _highest_bucket_idx(vehicle_dir: Path) -> int:
                 pass
     return mx
 
-def _vehicle_bucket_dir(vehicle_dir: Path) -> Path:
-    vehicle_dir.mkdir(parents=True, exist_ok=True)
-
-    # ensure there is at least download1
-    idx = _highest_bucket_idx(vehicle_dir)
-    if idx == 0:
-        idx = 1
-        (vehicle_dir / f"{BUCKET_PREFIX}{idx}").mkdir(parents=True, exist_ok=True)
-
-    bucket = vehicle_dir / f"{BUCKET_PREFIX}{idx}"
-    size_bytes = _dir_size_bytes(bucket)
-    if size_bytes >= MAX_OUTPUT_BYTES:
-        idx += 1
-        bucket = vehicle_dir / f"{BUCKET_PREFIX}{idx}"
-        bucket.mkdir(parents=True, exist_ok=True)
-        print(f"[INFO] download cap reached in {vehicle_dir} (size={size_bytes} bytes) → switching to {bucket}")
-
-    return bucket
-
-
 def _rel_out(p: Path) -> str:
     try:
         return str(p.relative_to(OUTPUT_DIR))
@@ -83,48 +235,366 @@ def _dir_size_bytes(p: Path) -> int:
     return total
 
 
+class BucketAllocator:
+    """
+    Running byte totals for the current downloads/<vehicle>/downloadN bucket.
+    Each vehicle dir is walked once, the first time it is used; after that
+    saved files are added with add() and the rollover to download{N+1}
+    happens from the in-memory counter, so choosing a bucket is O(1).
+    Files written by another process during the run are not seen.
+    """
+
+    def __init__(self):
+        self._state = {}  # vehicle_dir -> [bucket idx, bytes in that bucket]
+        self._lock = threading.Lock()
+
+    def _load(self, vehicle_dir: Path):
+        vehicle_dir.mkdir(parents=True, exist_ok=True)
+        # ensure there is at least download1
+        idx = max(1, _highest_bucket_idx(vehicle_dir))
+        bucket = vehicle_dir / f"{BUCKET_PREFIX}{idx}"
+        bucket.mkdir(parents=True, exist_ok=True)
+        return [idx, _dir_size_bytes(bucket)]
+
+    def bucket_for(self, vehicle_dir: Path) -> Path:
+        key = vehicle_dir.resolve()
+        with self._lock:
+            state = self._state.get(key)
+            if state is None:
+                state = self._state[key] = self._load(vehicle_dir)
+            if state[1] >= MAX_OUTPUT_BYTES:
+                size_bytes = state[1]
+                state[0] += 1
+                state[1] = 0
+                bucket = vehicle_dir / f"{BUCKET_PREFIX}{state[0]}"
+                bucket.mkdir(parents=True, exist_ok=True)
+                print(f"[INFO] download cap reached in {vehicle_dir} (size={size_bytes} bytes) → switching to {bucket}")
+            return vehicle_dir / f"{BUCKET_PREFIX}{state[0]}"
+
+    def add(self, path: Path, nbytes: int):
+        """Count nbytes (negative for a removed file) against path's bucket if it is still current."""
+        bucket = path.parent
+        key = bucket.parent.resolve()
+        with self._lock:
+            state = self._state.get(key)
+            if state is not None and bucket.name == f"{BUCKET_PREFIX}{state[0]}":
+                state[1] = max(0, state[1] + nbytes)
+
+    def reset(self):
+        with self._lock:
+            self._state.clear()
+
+
+BUCKETS = BucketAllocator()
+
 def out_dir_for(vehicle: str, day_str: str) -> Path:
     vehicle_dir = OUTPUT_DIR / vehicle
-    return _vehicle_bucket_dir(vehicle_dir)
+    return BUCKETS.bucket_for(vehicle_dir)
     
 def current_time_unix():
     return int(dt.datetime.now(dt.UTC).timestamp())
 
+def _retry_after_sec(value) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - dt.datetime.now(dt.UTC)).total_seconds())
+
+class RateLimiter:
+    """
+    Token bucket shared by every fleet-batch API call, with AIMD control of
+    the refill rate (requests/second):
+    - each success adds `increase / rate`, i.e. about +increase req/s per
+      second of traffic, up to max_rate
+    - 429 / 503, connection errors, or a latency EWMA above
+      latency_factor x the fastest EWMA seen for that endpoint multiply the
+      rate by `decrease` (at most once per `cooldown_sec`, so a burst of
+      in-flight failures counts as one signal), down to min_rate
+    - Retry-After blocks the whole bucket until it has passed
+    """
+
+    def __init__(self, rate: float = RATE_INITIAL, burst: float = RATE_BURST,
+                 min_rate: float = RATE_MIN, max_rate: float = RATE_MAX,
+                 increase: float = RATE_INCREASE, decrease: float = RATE_DECREASE,
+                 latency_factor: float = RATE_LATENCY_FACTOR,
+                 cooldown_sec: float = 2.0):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.cooldown_sec = cooldown_sec
+        self._tokens = burst
+        self._stamp = time.monotonic()
+        self._blocked_until = 0.0
+        self._last_cut = 0.0
+        self._latency = {}  # key -> [ewma, floor]
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if now < self._blocked_until:
+                    wait_s = self._blocked_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait_s = (1 - self._tokens) / self.rate
+            time.sleep(wait_s)
+
+    def _cut(self, now):
+        if now - self._last_cut >= self.cooldown_sec:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._last_cut = now
+
+    def observe(self, status: int | None, latency: float | None = None,
+                retry_after=None, key: str = ""):
+        """Feed back one response (status None = no response at all)."""
+        with self._lock:
+            now = time.monotonic()
+            wait_s = _retry_after_sec(retry_after)
+            if wait_s:
+                self._blocked_until = max(self._blocked_until, now + wait_s)
+
+            if status is None or status in (429, 503):
+                self._cut(now)
+                return
+
+            slow = False
+            if latency is not None:
+                stats = self._latency.setdefault(key, [latency, latency])
+                stats[0] = 0.8 * stats[0] + 0.2 * latency
+                stats[1] = min(stats[1], stats[0])
+                slow = stats[0] > self.latency_factor * stats[1]
+
+            if slow:
+                self._cut(now)
+            elif status < 500:
+                self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+
+RATE_LIMITER = RateLimiter()
+
+def configure_rate_limiter(**kwargs) -> RateLimiter:
+    """Replace the shared RATE_LIMITER (see RateLimiter for the knobs)."""
+    global RATE_LIMITER
+    RATE_LIMITER = RateLimiter(**kwargs)
+    return RATE_LIMITER
+
+class _ObservedRetry(Retry):
+    """Retry that reports the 429/5xx answers it swallows to RATE_LIMITER."""
+
+    def increment(self, method=None, url=None, response=None, error=None, *args, **kwargs):
+        if RATE_LIMITER is not None and url and url.startswith("/v1/"):
+            if response is not None:
+                RATE_LIMITER.observe(response.status, retry_after=response.headers.get("Retry-After"))
+            elif error is not None:
+                RATE_LIMITER.observe(None)
+        return super().increment(method, url, response, error, *args, **kwargs)
+
+class FleetBatchClient:
+    """
+    One keep-alive requests.Session shared by every call in this module.
+    - pool_size: connections kept open per host (>= concurrent workers)
+    - retries / backoff_sec / retry_statuses: urllib3 Retry policy applied
+      at the transport level (connect/read errors and the listed statuses,
+      honouring Retry-After)
+    - token: default bearer token; it is only attached to API_BASE URLs so
+      presigned S3 links never receive a second auth mechanism
+    Every API_BASE request first takes a token from RATE_LIMITER and then
+    reports its status and latency back to it.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, retries: int = RETRY_TOTAL,
+                 backoff_sec: float = RETRY_BACKOFF_SEC,
+                 retry_statuses=RETRY_STATUSES, token: str | None = None,
+                 api_base: str = API_BASE):
+        self.api_base = api_base
+        self.token = token
+        retry = _ObservedRetry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_sec,
+            status_forcelist=tuple(retry_statuses),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _headers(self, url, token, headers):
+        merged = dict(headers or {})
+        tok = token or self.token
+        if tok and url.startswith(self.api_base):
+            merged.setdefault("Authorization", f"Bearer {tok}")
+        return merged
+
+    def _request(self, method, url, token=None, headers=None, **kwargs):
+        limiter = RATE_LIMITER if url.startswith(self.api_base) else None
+        if limiter is not None:
+            limiter.acquire()
+        t0 = time.monotonic()
+        try:
+            r = self.session.request(method, url, headers=self._headers(url, token, headers), **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if limiter is not None:
+                limiter.observe(None)
+            raise
+        if limiter is not None:
+            limiter.observe(r.status_code, latency=time.monotonic() - t0,
+                            retry_after=r.headers.get("Retry-After"),
+                            key=f"{method} {urlsplit(url).path}")
+        return r
+
+    def get(self, url, token=None, headers=None, **kwargs):
+        return self._request("GET", url, token=token, headers=headers, **kwargs)
+
+    def head(self, url, token=None, headers=None, **kwargs):
+        return self._request("HEAD", url, token=token, headers=headers, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+CLIENT = FleetBatchClient()
+
+def configure_client(pool_size: int = POOL_SIZE, retries: int = RETRY_TOTAL,
+                     backoff_sec: float = RETRY_BACKOFF_SEC,
+                     retry_statuses=RETRY_STATUSES, token: str | None = None) -> FleetBatchClient:
+    """
+    Replace the module-level CLIENT, e.g. to raise pool_size before a run
+    with many workers. Returns the new client.
+    """
+    global CLIENT
+    old = CLIENT
+    CLIENT = FleetBatchClient(pool_size=pool_size, retries=retries,
+                              backoff_sec=backoff_sec,
+                              retry_statuses=retry_statuses, token=token)
+    old.close()
+    return CLIENT
+
+def _probe_ready(token, filename):
+    """
+    One readiness check of /v1/download: HEAD, or a streamed GET that is
+    closed right away when HEAD is not allowed. Returns the status or None.
+    """
+    params = {"filename": filename}
+    try:
+        r = CLIENT.head(DL_URL, token=token, params=params, timeout=15)
+        code = r.status_code
+        if code == 405:
+            r = CLIENT.get(DL_URL, token=token, params=params, timeout=15, stream=True)
+            code = r.status_code
+            r.close()
+    except requests.RequestException:
+        code = None
+    return code
+
 def wait_for_bag_ready(token, filename, max_wait_sec=100, base_sleep=3):
-    headers = {"Authorization": f"Bearer {token}"}
-    params  = {"filename": filename}
     deadline = time.time() + max_wait_sec
     sleep = base_sleep
 
     while time.time() < deadline:
-        try:
-            r = requests.head(DL_URL, headers=headers, params=params, timeout=15)
-            code = r.status_code
-            if code == 405:  
-                r = requests.get(DL_URL, headers=headers, params=params, timeout=15, stream=False)
-                code = r.status_code
-        except requests.RequestException:
-            code = None
-
-        if code == 200:
+        if _probe_ready(token, filename) == 200:
             return True
-        if code in (404, 500, 503) or code is None:
-            time.sleep(sleep)
-            sleep = min(sleep * 1.5, 30)
-            continue
-
         time.sleep(sleep)
         sleep = min(sleep * 1.5, 30)
 
     return False
 
+class ReadinessPoller:
+    """
+    asyncio service that waits for many server-side bag generations at once.
+    One background thread runs the event loop: every pending filename is a
+    coroutine whose backoff is an asyncio.sleep, and the HEAD checks
+    themselves run on a small executor (head_workers), so hundreds of
+    pending bags cost two or three threads instead of one blocked thread each.
+    """
+
+    def __init__(self, head_workers: int = READY_HEAD_WORKERS):
+        self._loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(max_workers=head_workers, thread_name_prefix="ready-head")
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ready-poller", daemon=True)
+        self._thread.start()
+
+    async def _poll(self, token, filename, max_wait_sec, base_sleep):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_wait_sec
+        sleep = base_sleep
+        while loop.time() < deadline:
+            code = await loop.run_in_executor(self._executor, _probe_ready, token, filename)
+            if code == 200:
+                return True
+            await asyncio.sleep(min(sleep, max(0.0, deadline - loop.time())))
+            sleep = min(sleep * 1.5, 30)
+        return False
+
+    def submit(self, token, filename, max_wait_sec=120, base_sleep=3, out_queue=None):
+        """
+        Start polling one filename. Returns a concurrent.futures.Future that
+        resolves to True (ready) or False (timed out); with out_queue set,
+        (filename, ready) is also put on it when the future settles.
+        """
+        fut = asyncio.run_coroutine_threadsafe(
+            self._poll(token, filename, max_wait_sec, base_sleep), self._loop)
+        if out_queue is not None:
+            fut.add_done_callback(
+                lambda f: out_queue.put((filename, (not f.cancelled()) and f.exception() is None and f.result())))
+        return fut
+
+    def wait_many(self, token, filenames, max_wait_sec=120, base_sleep=3):
+        """Poll all filenames concurrently and yield (filename, ready) as each one settles."""
+        futs = {self.submit(token, fn, max_wait_sec, base_sleep): fn for fn in filenames}
+        for fut in as_completed(futs):
+            yield futs[fut], fut.result()
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._executor.shutdown(wait=False)
+        self._loop.close()
+
+
+_READINESS = None
+_READINESS_LOCK = threading.Lock()
+
+def get_readiness_poller() -> ReadinessPoller:
+    global _READINESS
+    with _READINESS_LOCK:
+        if _READINESS is None:
+            _READINESS = ReadinessPoller()
+        return _READINESS
+
 def request_video_filename(token, vehicle, camera, start_ts, duration_s=DURATION_SECONDS):
+    with METRICS.stage("video", vehicle):
+        fname, code = _request_video_filename(token, vehicle, camera, start_ts, duration_s)
+    METRICS.count(f"video_{code}", vehicle=vehicle)
+    return fname, code
+
+def _request_video_filename(token, vehicle, camera, start_ts, duration_s):
     end_ts = start_ts + duration_s
     
-    headers = {"Authorization": f"Bearer {token}"}
     params = {"vehicle": vehicle, "camera": camera, "startTime": start_ts, "endTime": end_ts}
     try:
-        r = requests.get(VIDEO_URL, headers=headers, params=params, timeout=(10, 120))
+        r = CLIENT.get(VIDEO_URL, token=token, params=params, timeout=(10, 120))
     except (requests.ReadTimeout, requests.ConnectionError) as e:
         when = dt.datetime.fromtimestamp(start_ts, dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
         print(f"[MISS][timeout] {when}Z {vehicle} {camera}: {e}")
@@ -166,27 +636,294 @@ def request_video_filename(token, vehicle, camera, start_ts, duration_s=DURATION
 def _looks_like_url_bytes(b: bytes) -> bool:
     return b.startswith(b"http://") or b.startswith(b"https://")
 
-def _download_stream(url, out_path, timeout=300, headers=None):
-    with requests.get(url, stream=True, timeout=timeout, headers=headers, allow_redirects=True) as r:
-        r.raise_for_status()
-        tmp = out_path.with_suffix(out_path.suffix + ".part")
-        with open(tmp, "wb") as f:
-            for chunk in r.iter_content(1 << 20):
-                if chunk:
-                    if len(chunk) < 1024 and _looks_like_url_bytes(chunk.strip()):
-                        next_url = chunk.decode("utf-8", errors="ignore").strip().split()[0]
-                        f.close()
-                        try: tmp.unlink(missing_ok=True)
-                        except Exception: pass
-                        return _download_stream(next_url, out_path, timeout=timeout, headers=None)
-                    f.write(chunk)
+BagInfo = namedtuple("BagInfo", "size sha256")
+
+class _StreamCheck:
+    """Rolling sha256, byte count and leading bytes of a body as it is written."""
+
+    HEAD_BYTES = 64
+
+    def __init__(self):
+        self.sha = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+
+    @classmethod
+    def from_file(cls, path: Path):
+        """Check state for bytes already on disk (a resumed .part or a segmented file)."""
+        check = cls()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                check.update(block)
+        return check
+
+    def update(self, chunk: bytes):
+        if len(self.head) < self.HEAD_BYTES:
+            self.head += chunk[:self.HEAD_BYTES - len(self.head)]
+        self.sha.update(chunk)
+        self.size += len(chunk)
+
+    def is_rosbag(self) -> bool:
+        return self.head.startswith(ROSBAG_MAGIC)
+
+    def info(self) -> BagInfo:
+        return BagInfo(self.size, self.sha.hexdigest())
+
+_BAG_INFO = OrderedDict()  # str(path) -> BagInfo for bags written by this process
+_BAG_INFO_MAX = 4096
+_BAG_INFO_LOCK = threading.Lock()
+
+def bag_info(path: Path, need_sha: bool = True) -> BagInfo:
+    """
+    Size and sha256 of a bag. Bags this process just downloaded were hashed
+    while streaming and are answered without touching the file; anything
+    else is read from disk. With need_sha=False an unknown bag is only
+    stat()ed and its sha256 comes back as None, so reporting the size of a
+    multi-GB bag from an earlier run does not read it.
+    """
+    with _BAG_INFO_LOCK:
+        info = _BAG_INFO.get(str(path))
+    if info is not None:
+        return info
+    size = path.stat().st_size
+    return BagInfo(size, _sha256_file(path) if need_sha else None)
+
+def _remember_bag(path: Path, info: BagInfo):
+    with _BAG_INFO_LOCK:
+        _BAG_INFO[str(path)] = info
+        _BAG_INFO.move_to_end(str(path))
+        while len(_BAG_INFO) > _BAG_INFO_MAX:
+            _BAG_INFO.popitem(last=False)
+
+def _cas_path(digest: str) -> Path:
+    return OUTPUT_DIR / CAS_DIR_NAME / digest[:2] / f"{digest}.bag"
+
+def _place_deduped(tmp: Path, out_path: Path, info: BagInfo) -> bool:
+    """
+    Move tmp to out_path through the content-addressed store under
+    OUTPUT_DIR/CAS_DIR_NAME: when a bag with the same sha256 is already
+    stored, out_path becomes a hardlink to it and tmp is dropped; otherwise
+    tmp becomes out_path and is linked into the store. Filesystems without
+    hardlinks simply keep their own copy. Returns True if a stored copy was reused.
+    """
+    obj = _cas_path(info.sha256)
+    try:
+        if obj.exists() and obj.stat().st_size == info.size:
+            link = tmp.with_name(tmp.name + ".lnk")
+            link.unlink(missing_ok=True)
+            os.link(obj, link)
+            link.replace(out_path)
+            tmp.unlink(missing_ok=True)
+            return True
+    except OSError:
+        pass
+    tmp.replace(out_path)
+    try:
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        os.link(out_path, obj)
+    except OSError:
+        pass
+    return False
+
+def sweep_cas(output_dir: Path | None = None) -> tuple[int, int]:
+    """
+    Remove store entries under output_dir/CAS_DIR_NAME that no bag links to
+    any more (st_nlink == 1), so deleted or rolled-over buckets actually free
+    their space. Returns (files removed, bytes freed).
+    """
+    store = (OUTPUT_DIR if output_dir is None else output_dir) / CAS_DIR_NAME
+    removed = freed = 0
+    if not store.exists():
+        return 0, 0
+    for obj in store.glob("*/*.bag"):
+        try:
+            st = obj.stat()
+            if st.st_nlink == 1:
+                obj.unlink()
+                removed += 1
+                freed += st.st_size
+        except OSError:
+            pass
+    for shard in store.iterdir():
+        with contextlib.suppress(OSError):
+            shard.rmdir()  # only succeeds when empty
+    return removed, freed
+
+def _sweep_cas_before_run():
+    """Start-of-run sweep_cas() for the pull/grab entry points (only when DEDUPE_BAGS is on)."""
+    if not DEDUPE_BAGS:
+        return
+    removed, freed = sweep_cas()
+    if removed:
+        print(f"[INFO] dropped {removed} unreferenced bag(s) ({freed} bytes) from {CAS_DIR_NAME}")
+
+def _parse_content_range(value):
+    """
+    "bytes 100-199/2000" -> (100, 199, 2000); "bytes */2000" -> (None, None, 2000).
+    Unknown totals ("/*") come back as None. Returns None if unparsable.
+    """
+    m = re.match(r"\s*bytes\s+(?:(\d+)-(\d+)|\*)/(\d+|\*)", value or "")
+    if not m:
+        return None
+    start, end, total = m.groups()
+    return (int(start) if start is not None else None,
+            int(end) if end is not None else None,
+            int(total) if total != "*" else None)
+
+def _content_length(r):
+    enc = (r.headers.get("Content-Encoding") or "identity").lower()
+    cl = r.headers.get("Content-Length")
+    if enc != "identity" or cl is None:
+        return None
+    try:
+        return int(cl)
+    except ValueError:
+        return None
+
+def _finalize_download(tmp: Path, out_path: Path, check: _StreamCheck | None = None):
+    """
+    Validate a finished temp file, move it into place (deduplicated against
+    identical bags when DEDUPE_BAGS is on) and count it against its bucket.
+    check: the _StreamCheck filled while streaming; None (segmented writes,
+    which land out of order) hashes the file once here.
+    Returns out_path, or False when the body is not a rosbag and
+    REQUIRE_ROSBAG_MAGIC is on.
+    """
+    if check is None:
+        check = _StreamCheck.from_file(tmp)
+    if not check.is_rosbag():
+        METRICS.count("not_rosbag")
+        if REQUIRE_ROSBAG_MAGIC:
+            print(f"[WARN] {out_path.name}: not a rosbag (starts with {check.head[:16]!r}); discarded")
+            tmp.unlink(missing_ok=True)
+            return False
+        print(f"[WARN] {out_path.name}: no rosbag V2.0 header (starts with {check.head[:16]!r}); kept")
+
+    info = check.info()
+    old = out_path.stat().st_size if out_path.exists() else 0
+    if DEDUPE_BAGS and info.size >= MIN_VALID_BYTES and _place_deduped(tmp, out_path, info):
+        METRICS.count("deduped")
+    elif tmp.exists():
         tmp.replace(out_path)
+    # bucket caps stay in logical bytes, the same way _dir_size_bytes counts them
+    BUCKETS.add(out_path, info.size - old)
+    METRICS.add_bytes(info.size)
+    _remember_bag(out_path, info)
     return out_path
 
+def _write_body(r, tmp, offset, prefix=b""):
+    """
+    Write one response into tmp, appending when it is a 206 that continues
+    at offset, and hash it on the way through. prefix: bytes already read
+    from the start of this response's body. Returns ("done", _StreamCheck),
+    ("short", None) when the byte count does not match Content-Length /
+    Content-Range, or ("url", next_url) when the body turned out to be a
+    presigned link.
+    """
+    if offset and r.status_code == 416:
+        cr = _parse_content_range(r.headers.get("Content-Range"))
+        if cr and cr[2] == offset:
+            return "done", _StreamCheck.from_file(tmp)
+        tmp.unlink(missing_ok=True)
+        return "short", None
+
+    r.raise_for_status()
+
+    cr = _parse_content_range(r.headers.get("Content-Range"))
+    if offset and r.status_code == 206 and cr and cr[0] == offset:
+        mode, expected, check = "ab", cr[2], _StreamCheck.from_file(tmp)
+    else:
+        if offset:
+            print(f"[INFO] server ignored Range for {tmp.name}; restarting from byte 0")
+        mode, expected, check = "wb", _content_length(r), _StreamCheck()
+
+    chunks = r.iter_content(1 << 20)
+    if prefix:
+        chunks = itertools.chain([prefix], chunks)
+    with open(tmp, mode) as f:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if check.size == 0 and len(chunk) < 1024 and _looks_like_url_bytes(chunk.strip()):
+                f.close()
+                tmp.unlink(missing_ok=True)
+                return "url", chunk.decode("utf-8", errors="ignore").strip().split()[0]
+            f.write(chunk)
+            check.update(chunk)
+
+    if expected is not None and check.size != expected:
+        print(f"[WARN] {tmp.name}: got {check.size} of {expected} bytes")
+        if check.size > expected:
+            tmp.unlink(missing_ok=True)
+        return "short", None
+    return "done", check
+
+def _download_stream(url, out_path, timeout=300, headers=None, token=None, params=None,
+                     resp=None, prefix=b"", attempts=RESUME_ATTEMPTS):
+    """
+    Stream url into out_path through out_path.part.
+    - an existing .part (from an interrupted attempt or an earlier run) is
+      resumed with "Range: bytes=<size>-"; a 200 reply means the server
+      ignored the range and the file is rewritten from byte 0
+    - the final size is checked against Content-Length / Content-Range, and
+      the body is hashed and checked for the rosbag header as it streams
+    - interrupted or short transfers are retried up to `attempts` times,
+      each retry resuming from whatever reached the .part
+    resp: an already-open 200 response for url whose first bytes (prefix)
+    were already read; it is used for the first attempt. A 200 means the
+    server ignores ranges, so an existing .part could not be resumed anyway.
+    Returns out_path, or False (the .part is kept for the next run).
+    """
+    tmp = out_path.with_suffix(out_path.suffix + ".part")
+
+    for attempt in range(1, attempts + 1):
+        offset = tmp.stat().st_size if tmp.exists() else 0
+        try:
+            if resp is not None:
+                r, resp, body_offset, head = resp, None, 0, prefix
+            else:
+                body_offset, head = offset, b""
+                req_headers = dict(headers or {})
+                if offset:
+                    req_headers["Range"] = f"bytes={offset}-"
+                    req_headers["Accept-Encoding"] = "identity"
+                r = CLIENT.get(url, token=token, params=params, headers=req_headers,
+                               stream=True, timeout=timeout, allow_redirects=True)
+            with r:
+                status, result = _write_body(r, tmp, body_offset, head)
+        except requests.HTTPError as e:
+            print(f"[WARN] {out_path.name}: {e}")
+            return False
+        except requests.RequestException as e:
+            have = tmp.stat().st_size if tmp.exists() else 0
+            print(f"[WARN] {out_path.name} interrupted at {have} bytes "
+                  f"(attempt {attempt}/{attempts}): {type(e).__name__}")
+            status, result = "short", None
+
+        if status == "url":
+            return _download_stream(result, out_path, timeout=timeout, attempts=attempts)
+        if status == "done":
+            return _finalize_download(tmp, out_path, result)
+        if attempt < attempts:
+            time.sleep(min(2 ** attempt, 30))
+
+    print(f"[WARN] {out_path.name}: giving up after {attempts} attempts, keeping {tmp.name} for resume")
+    return False
+
+BinaryProbe = namedtuple("BinaryProbe", "resp prefix")
+
 def _get_presigned_or_binary_response(token, filename, timeout=180):
-    headers = {"Authorization": f"Bearer {token}"}
+    """
+    Resolve how /v1/download delivers a bag, asking only for its first
+    PROBE_BYTES. Returns ("url", presigned_url), ("resp", BinaryProbe) when
+    the bag bytes come straight from /v1/download, or ("fail", reason).
+    BinaryProbe.resp is a 206 whose body (prefix) is all that was asked
+    for, or a still-open 200 with the whole body when the server ignores
+    ranges; prefix holds the bytes already read from it.
+    """
     params  = {"filename": filename}
-    r = requests.get(DL_URL, headers=headers, params=params, stream=True, timeout=timeout, allow_redirects=False)
+    r = CLIENT.get(DL_URL, token=token, params=params, stream=True, timeout=timeout, allow_redirects=False,
+                   headers={"Range": f"bytes=0-{PROBE_BYTES - 1}", "Accept-Encoding": "identity"})
 
     if r.is_redirect or r.status_code in (302, 303, 307, 308):
         loc = r.headers.get("Location")
@@ -195,18 +932,25 @@ def _get_presigned_or_binary_response(token, filename, timeout=180):
             return ("url", loc)
 
     ctype = (r.headers.get("Content-Type") or "").lower()
-    if r.status_code == 200 and ("octet-stream" in ctype or "application/x-rosbag" in ctype or "binary" in ctype):
-        prefix = r.raw.read(4096, decode_content=True)
+    if r.status_code in (200, 206) and ("octet-stream" in ctype or "application/x-rosbag" in ctype or "binary" in ctype):
+        prefix = r.raw.read(PROBE_BYTES, decode_content=True)
         if _looks_like_url_bytes(prefix):
             r.close()
             presigned = prefix.decode("utf-8", errors="ignore").strip().split()[0]
             return ("url", presigned)
-        r.close()
-        r2 = requests.get(DL_URL, headers=headers, params=params, stream=True, timeout=timeout, allow_redirects=True)
-        return ("resp", r2)
+        if r.status_code == 206:
+            r.close()  # the probed range is all of this body
+        return ("resp", BinaryProbe(r, prefix))
 
-    if r.status_code == 200:
+    if r.status_code in (200, 206):
+        # a server that honours Range on the URL / JSON body answers 206 with
+        # (up to) PROBE_BYTES of it; fetch the rest if it got cut off
         body = r.content[:8192]
+        cr = _parse_content_range(r.headers.get("Content-Range")) if r.status_code == 206 else None
+        if cr and cr[2] and cr[2] > len(body):
+            r.close()
+            r = CLIENT.get(DL_URL, token=token, params=params, timeout=timeout, allow_redirects=False)
+            body = r.content[:8192] if r.status_code == 200 else b""
         txt = body.decode("utf-8", errors="ignore").strip()
         if txt.startswith(("http://", "https://")):
             r.close()
@@ -222,88 +966,568 @@ def _get_presigned_or_binary_response(token, filename, timeout=180):
     return ("fail", f"status={r.status_code}, ctype={ctype}")
 
 def _extract_filename_from_headers(resp, fallback_name):
-    import re
     cd = resp.headers.get("Content-Disposition", "")
     m = re.search(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)"?', cd)
     if m:
         return m.group(1)
     return fallback_name
 
-def download_bag(token, filename, out_dir=OUTPUT_DIR, final_filename: str | None = None):
+def _probe_range_total(url, token=None, params=None, timeout=60):
+    """
+    One-byte ranged GET (presigned URLs are signed for GET, not HEAD).
+    Returns the object size if the server honours byte ranges, else None.
+    """
+    try:
+        with CLIENT.get(url, token=token, params=params, stream=True, timeout=timeout,
+                        headers={"Range": "bytes=0-0", "Accept-Encoding": "identity"},
+                        allow_redirects=True) as r:
+            accepts = (r.headers.get("Accept-Ranges") or "").lower() == "bytes"
+            cr = _parse_content_range(r.headers.get("Content-Range"))
+            if r.status_code == 206 and cr and cr[2]:
+                return cr[2]
+            if r.status_code == 200 and accepts:
+                return _content_length(r)
+    except requests.RequestException:
+        pass
+    return None
+
+def _fetch_segment(url, fd, start, end, token=None, params=None, timeout=300,
+                   attempts=RESUME_ATTEMPTS):
+    """Fetch bytes [start, end] with positional writes, resuming the range on errors."""
+    pos = start
+    for attempt in range(1, attempts + 1):
+        try:
+            with CLIENT.get(url, token=token, params=params, stream=True, timeout=timeout,
+                            headers={"Range": f"bytes={pos}-{end}", "Accept-Encoding": "identity"},
+                            allow_redirects=True) as r:
+                cr = _parse_content_range(r.headers.get("Content-Range"))
+                if r.status_code != 206 or not cr or cr[0] != pos:
+                    raise IOError(f"range {pos}-{end} not honoured (status={r.status_code})")
+                for chunk in r.iter_content(1 << 20):
+                    if chunk:
+                        chunk = chunk[:end + 1 - pos]
+                        os.pwrite(fd, chunk, pos)
+                        pos += len(chunk)
+                        if pos > end:
+                            break
+        except requests.RequestException:
+            pass
+        if pos == end + 1:
+            return
+        if attempt < attempts:
+            time.sleep(min(2 ** attempt, 30))
+    raise IOError(f"range {start}-{end} stopped at byte {pos}")
+
+def _download_segmented(url, out_path, segments, total=None, token=None, params=None,
+                        timeout=300):
+    """
+    Fetch one object as `segments` concurrent byte ranges written straight
+    into a preallocated out_path.segpart with os.pwrite, then rename it.
+    Segments are never smaller than SEGMENT_MIN_BYTES.
+    Returns out_path, False when the result is not a rosbag, or None when
+    ranges are unsupported or a segment failed, in which case the caller
+    should use the streaming path.
+    """
+    if not hasattr(os, "pwrite"):
+        return None
+    if out_path.with_suffix(out_path.suffix + ".part").exists():
+        # an interrupted streaming download is cheaper to resume
+        return None
+    if total is None:
+        total = _probe_range_total(url, token=token, params=params)
+    if not total:
+        return None
+
+    n = max(1, min(int(segments), total // SEGMENT_MIN_BYTES))
+    if n < 2:
+        return None
+    step = -(-total // n)
+    bounds = [(s, min(s + step, total) - 1) for s in range(0, total, step)]
+
+    tmp = out_path.with_suffix(out_path.suffix + ".segpart")
+    fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    ok = False
+    try:
+        os.ftruncate(fd, total)
+        with ThreadPoolExecutor(max_workers=len(bounds)) as pool:
+            futs = [pool.submit(_fetch_segment, url, fd, s, e, token, params, timeout)
+                    for s, e in bounds]
+            for fut in futs:
+                fut.result()
+        ok = True
+    except IOError as e:
+        print(f"[WARN] segmented download of {out_path.name} failed ({e}); falling back to streaming")
+    finally:
+        os.close(fd)
+
+    if not ok:
+        tmp.unlink(missing_ok=True)
+        return None
+    return _finalize_download(tmp, out_path)
+
+def download_bag(token, filename, out_dir=OUTPUT_DIR, final_filename: str | None = None,
+                 segments: int | None = None, wait_ready: bool = True):
+    """
+    segments: split the transfer into that many concurrent byte ranges
+    (default DOWNLOAD_SEGMENTS; 1 keeps the single streaming connection).
+    Servers that do not advertise byte ranges always use streaming.
+    wait_ready=False skips the blocking readiness poll, for callers that
+    already saw the bag become ready through ReadinessPoller.
+    """
+    segments = DOWNLOAD_SEGMENTS if segments is None else segments
     out_dir.mkdir(parents=True, exist_ok=True)
-    if not wait_for_bag_ready(token, filename, max_wait_sec=120, base_sleep=3):
-        return False
+    if wait_ready:
+        with METRICS.stage("ready"):
+            ready = wait_for_bag_ready(token, filename, max_wait_sec=120, base_sleep=3)
+        if not ready:
+            return False
+
+    with METRICS.stage("resolve"):
+        kind, payload = _get_presigned_or_binary_response(token, filename, timeout=180)
 
-    kind, payload = _get_presigned_or_binary_response(token, filename, timeout=180)
+    with METRICS.stage("transfer"):
+        return _fetch_resolved(token, filename, kind, payload, out_dir, final_filename, segments)
 
+def _fetch_resolved(token, filename, kind, payload, out_dir, final_filename, segments):
+    """Transfer stage of download_bag for a ("url" | "resp" | "fail", payload) lookup result."""
     chosen_name = final_filename if final_filename else filename
     out_path = out_dir / chosen_name
 
     if kind == "url":
+        if segments > 1:
+            path = _download_segmented(payload, out_path, segments, timeout=300)
+            if path is not None:
+                return path
         return _download_stream(payload, out_path, timeout=300, headers=None)
 
     if kind == "resp":
-        resp = payload
+        resp, prefix = payload
         if final_filename is None:
             suggested = _extract_filename_from_headers(resp, filename)
             out_path = out_dir / suggested
+        params = {"filename": filename}
+
+        if resp.status_code == 200:
+            # ranges ignored: the probe is the full transfer, keep reading it
+            return _download_stream(DL_URL, out_path, timeout=300, token=token,
+                                    params=params, resp=resp, prefix=prefix)
+
+        cr = _parse_content_range(resp.headers.get("Content-Range"))
+        total = cr[2] if cr and cr[0] == 0 else None
+        if segments > 1 and total:
+            path = _download_segmented(DL_URL, out_path, segments, total=total,
+                                       token=token, params=params, timeout=300)
+            if path is not None:
+                return path
 
         tmp = out_path.with_suffix(out_path.suffix + ".part")
-        with open(tmp, "wb") as f:
-            for chunk in resp.itercontent(1 << 20):
-                if chunk:
-                    if len(chunk) < 1024 and _looks_like_url_bytes(chunk.strip()):
-                        presigned = chunk.decode("utf-8", errors="ignore").strip().split()[0]
-                        resp.close()
-                        f.close()
-                        try: tmp.unlink(missing_ok=True)
-                        except Exception: pass
-                        return _download_stream(presigned, out_path, timeout=300, headers=None)
-                    f.write(chunk)
-        resp.close()
-        tmp.replace(out_path)
-        return out_path
+        if total and not tmp.exists():
+            # seed the .part with the probed bytes; the stream resumes after them
+            tmp.write_bytes(prefix)
+        return _download_stream(DL_URL, out_path, timeout=300, token=token, params=params)
 
     print(f"[WARN] failed to download {filename}: {payload}")
     return False
     
 
-def pull_videos(token, vehicles, camera, start_ts, total_seconds, window_seconds=30, bucket_by_end=False, throttle_sec=THROTTLE_SEC):
+_TIMESLOT_RE = re.compile(
+    r"^(?P<vehicle>[^_]+)_(?P<camera>.+)_(?P<stamp>\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2}Z)_(?P<dur>\d+)s\.bag$"
+)
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class DownloadManifest:
+    """
+    SQLite index of every slot outcome, keyed by (vehicle, camera, start_ts, duration).
+    status is one of "saved", "404", "tiny", "failed"; saved rows also carry
+    size, sha256 and the path relative to OUTPUT_DIR. Rows are committed as
+    they are written, so a crashed run loses at most the slots in flight.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS slots (
+                   vehicle TEXT NOT NULL,
+                   camera TEXT NOT NULL,
+                   start_ts INTEGER NOT NULL,
+                   duration INTEGER NOT NULL,
+                   status TEXT NOT NULL,
+                   code INTEGER,
+                   size INTEGER,
+                   sha256 TEXT,
+                   path TEXT,
+                   updated_at INTEGER NOT NULL,
+                   PRIMARY KEY (vehicle, camera, start_ts, duration)
+               )"""
+        )
+
+    def lookup(self, vehicle, camera, start_ts, duration):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, code, size, sha256, path, updated_at FROM slots "
+                "WHERE vehicle=? AND camera=? AND start_ts=? AND duration=?",
+                (vehicle, camera, int(start_ts), int(duration)),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("status", "code", "size", "sha256", "path", "updated_at"), row))
+
+    def record(self, vehicle, camera, start_ts, duration, status,
+               code=None, size=None, sha256=None, path: Path | None = None):
+        rel = _rel_out(path) if path is not None else None
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO slots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (vehicle, camera, int(start_ts), int(duration), status,
+                 code, size, sha256, rel, current_time_unix()),
+            )
+
+    def forget(self, statuses=("404",), vehicle=None, start_ts=None, end_ts=None) -> int:
+        """
+        Drop rows with one of statuses (None = any), optionally limited to a
+        vehicle and to slots starting in [start_ts, end_ts), so the next run
+        asks the API about them again. Returns the number of rows removed.
+        """
+        where, args = [], []
+        if statuses is not None:
+            where.append(f"status IN ({', '.join('?' * len(statuses))})")
+            args.extend(statuses)
+        if vehicle is not None:
+            where.append("vehicle=?")
+            args.append(vehicle)
+        if start_ts is not None:
+            where.append("start_ts>=?")
+            args.append(int(start_ts))
+        if end_ts is not None:
+            where.append("start_ts<?")
+            args.append(int(end_ts))
+        sql = "DELETE FROM slots" + (" WHERE " + " AND ".join(where) if where else "")
+        with self._lock:
+            return self._db.execute(sql, args).rowcount
+
+    def import_existing(self, output_dir: Path | None = None) -> int:
+        """
+        One-time walk of downloads/<vehicle>/downloadN/ that records every
+        timeslot-named bag not yet in the index as "saved" (no checksum).
+        Returns the number of rows added.
+        """
+        output_dir = OUTPUT_DIR if output_dir is None else output_dir
+        added = 0
+        for bag in output_dir.glob(f"*/{BUCKET_PREFIX}*/*.bag"):
+            m = _TIMESLOT_RE.match(bag.name)
+            if not m:
+                continue
+            stamp = dt.datetime.strptime(m["stamp"], "%Y-%m-%dT%H-%M-%SZ").replace(tzinfo=dt.UTC)
+            key = (m["vehicle"], m["camera"], int(stamp.timestamp()), int(m["dur"]))
+            if self.lookup(*key) is not None:
+                continue
+            self.record(*key, "saved", code=200, size=bag.stat().st_size, path=bag)
+            added += 1
+        return added
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_MANIFEST = None
+_MANIFEST_LOCK = threading.Lock()
+
+def get_manifest() -> DownloadManifest | None:
+    """
+    Open OUTPUT_DIR/MANIFEST_NAME on first use; None when USE_MANIFEST is off.
+    A newly created manifest is seeded from the bags already on disk.
+    """
+    global _MANIFEST
+    if not USE_MANIFEST:
+        return None
+    with _MANIFEST_LOCK:
+        path = OUTPUT_DIR / MANIFEST_NAME
+        if _MANIFEST is None or _MANIFEST.path != path:
+            if _MANIFEST is not None:
+                _MANIFEST.close()
+            fresh = not path.exists()
+            _MANIFEST = DownloadManifest(path)
+            if fresh:
+                n = _MANIFEST.import_existing()
+                if n:
+                    print(f"[INFO] manifest seeded with {n} bag(s) already in {OUTPUT_DIR}")
+        return _MANIFEST
+
+def _manifest_hit(manifest, vehicle, camera, ts, dur):
+    """
+    Outcome of a slot already settled by an earlier run, as (status, path),
+    or None if it has to be fetched. Saved rows whose file has vanished
+    are fetched again, "404" rows once they are older than
+    MANIFEST_MISS_TTL_SEC (footage is often uploaded late), and with
+    MANIFEST_RESCAN everything but saved bags.
+    """
+    entry = manifest.lookup(vehicle, camera, ts, dur)
+    if entry is None or entry["status"] not in MANIFEST_SKIP_STATUSES:
+        return None
+    if MANIFEST_RESCAN and entry["status"] != "saved":
+        return None
+    if (entry["status"] == "404" and MANIFEST_MISS_TTL_SEC is not None
+            and current_time_unix() - entry["updated_at"] >= MANIFEST_MISS_TTL_SEC):
+        return None
+    if entry["status"] == "saved":
+        path = OUTPUT_DIR / entry["path"]
+        if not path.exists():
+            return None
+        return "saved", path
+    if entry["status"] == "404":
+        return "miss", None
+    return "skip", None
+
+def _slot_range(start_ts, end_ts, window_seconds=DURATION_SECONDS):
+    ts = int(start_ts)
+    while ts < end_ts:
+        dur = int(min(window_seconds, end_ts - ts))
+        dur = max(1, min(30, dur))
+        yield ts, dur
+        ts += dur
+
+PendingReady = namedtuple("PendingReady", "token filename finish")
+
+def _process_slot(token, vehicle, camera, ts, dur,
+                  final_filename: str | None = None,
+                  min_valid_bytes: int | None = None,
+                  bucket_ts: int | None = None,
+                  defer_ready: bool = False):
+    """
+    Run one 30 s slot end to end: /v1/video -> readiness poll -> download.
+    Slots already settled in the download manifest are answered from it
+    without touching the API, and every new outcome is recorded there.
+    Prints the MISS / SKIP / tiny-file lines; the caller prints OK.
+    Returns (status, path) with status in {"saved", "miss", "skip"}.
+    With defer_ready=True a slot that got a filename instead returns
+    PendingReady(token, filename, finish); once readiness is known the
+    caller runs finish(ready) to download and get (status, path).
+    """
+    _CURRENT_VEHICLE.set(vehicle)
+    when = dt.datetime.fromtimestamp(ts, dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
+    manifest = get_manifest()
+    if manifest is not None:
+        hit = _manifest_hit(manifest, vehicle, camera, ts, dur)
+        if hit is not None:
+            print(f"[CACHED] {when}Z {vehicle}: {hit[0]} in manifest")
+            return hit
+
+    fname, code = request_video_filename(token, vehicle, camera, ts, dur)
+    if not fname:
+        print(f"[MISS] {when}Z {vehicle} (code={code})")
+        if manifest is not None and code == 404:
+            manifest.record(vehicle, camera, ts, dur, "404", code=code)
+        return "miss", None
+
+    def finish(ready=None):
+        return _finish_slot(token, vehicle, camera, ts, dur, fname, code, ready,
+                            final_filename, min_valid_bytes, bucket_ts)
+
+    if defer_ready:
+        return PendingReady(token, fname, finish)
+    return finish()
+
+def _finish_slot(token, vehicle, camera, ts, dur, fname, code, ready,
+                 final_filename, min_valid_bytes, bucket_ts):
+    """
+    Download stage of _process_slot. ready=None polls readiness inline,
+    True skips the poll, False means the bag never became ready.
+    """
+    _CURRENT_VEHICLE.set(vehicle)
+    when = dt.datetime.fromtimestamp(ts, dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
+    manifest = get_manifest()
+    if ready is False:
+        print(f"[SKIP] {when}Z {vehicle}: bag not ready in time")
+        if manifest is not None:
+            manifest.record(vehicle, camera, ts, dur, "failed", code=code)
+        return "skip", None
+
+    day_ts = ts if bucket_ts is None else bucket_ts
+    day_str = dt.datetime.fromtimestamp(day_ts, DAY_TZ).strftime("%Y-%m-%d")
+    out_dir = out_dir_for(vehicle, day_str)
+    path = download_bag(token, fname, out_dir, final_filename=final_filename,
+                        wait_ready=ready is None)
+    if not path:
+        print(f"[SKIP] {when}Z {vehicle}: download failed")
+        if manifest is not None:
+            manifest.record(vehicle, camera, ts, dur, "failed", code=code)
+        return "skip", None
+
+    info = bag_info(path, need_sha=False)
+    sz = info.size
+    if min_valid_bytes is not None and sz < min_valid_bytes:
+        try:
+            path.unlink()
+            BUCKETS.add(path, -sz)
+        except Exception: pass
+        print(f"[WARN] {when}Z {vehicle} tiny file ({sz} bytes) – counted as SKIP")
+        if manifest is not None:
+            manifest.record(vehicle, camera, ts, dur, "tiny", code=code, size=sz)
+        return "skip", None
+
+    if manifest is not None:
+        manifest.record(vehicle, camera, ts, dur, "saved", code=code, size=sz,
+                        sha256=info.sha256, path=path)
+    return "saved", path
+
+def run_slots_concurrently(work, slots_by_vehicle,
+                           max_workers: int = MAX_WORKERS,
+                           per_vehicle_workers: int = PER_VEHICLE_WORKERS,
+                           cap: int | None = None,
+                           on_result=None,
+                           max_pending_ready: int = MAX_PENDING_READY):
+    """
+    Bounded thread-pool scheduler for per-slot downloads.
+    work: callable(vehicle, ts, dur) -> (status, path) or PendingReady,
+          run on a worker thread
+    slots_by_vehicle: dict[vehicle -> iterable[(ts, dur)]]
+    At most max_workers slots are running on the pool overall and at most
+    per_vehicle_workers for any one vehicle, so the /v1/video request,
+    readiness poll and download of different slots overlap.
+    A PendingReady result is handed to the shared ReadinessPoller and does
+    not hold a worker while the server builds the bag (at most
+    max_pending_ready of those at once); when it settles, its finish() runs
+    on the pool.
+    cap: stop starting new slots for a vehicle once saved + in-flight reaches it.
+    on_result: callable(vehicle, ts, status, path), run on the calling thread.
+    Returns dict[vehicle -> {"saved", "miss", "skip"}].
+    """
+    per_vehicle_workers = max(1, int(per_vehicle_workers))
+    max_workers = max(1, int(max_workers))
+    if max_pending_ready < 1:
+        raise ValueError("max_pending_ready must be >= 1")
+
+    stats = {v: {"saved": 0, "miss": 0, "skip": 0} for v in slots_by_vehicle}
+    pending = {v: iter(slots) for v, slots in slots_by_vehicle.items()}
+    busy = {v: 0 for v in slots_by_vehicle}
+    waiting = {v: 0 for v in slots_by_vehicle}
+    in_flight = {}  # future -> (vehicle, ts, finish); finish is set for readiness futures
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or in_flight:
+            # round-robin refill so one vehicle cannot starve the others
+            for vehicle in list(pending):
+                while (busy[vehicle] < per_vehicle_workers
+                       and sum(busy.values()) < max_workers
+                       and sum(waiting.values()) < max_pending_ready):
+                    if cap is not None and stats[vehicle]["saved"] >= cap:
+                        del pending[vehicle]
+                        break
+                    if cap is not None and stats[vehicle]["saved"] + busy[vehicle] + waiting[vehicle] >= cap:
+                        break
+                    slot = next(pending[vehicle], None)
+                    if slot is None:
+                        del pending[vehicle]
+                        break
+                    ts, dur = slot
+                    fut = pool.submit(work, vehicle, ts, dur)
+                    in_flight[fut] = (vehicle, ts, None)
+                    busy[vehicle] += 1
+
+            if not in_flight:
+                if pending:
+                    # nothing running and nothing could be started: avoid spinning
+                    raise RuntimeError(f"scheduler stalled with slots left for {sorted(pending)}")
+                continue
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                vehicle, ts, finish = in_flight.pop(fut)
+                if finish is not None:
+                    # readiness settled: run the download stage on the pool
+                    finish, t_submit = finish
+                    METRICS.observe("ready", time.perf_counter() - t_submit, vehicle)
+                    waiting[vehicle] -= 1
+                    try:
+                        ready = bool(fut.result())
+                    except Exception:
+                        ready = False
+                    nxt = pool.submit(finish, ready)
+                    in_flight[nxt] = (vehicle, ts, None)
+                    busy[vehicle] += 1
+                    continue
+
+                busy[vehicle] -= 1
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    when = dt.datetime.fromtimestamp(ts, dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
+                    print(f"[SKIP] {when}Z {vehicle}: {type(e).__name__}: {e}")
+                    result = ("skip", None)
+
+                if isinstance(result, PendingReady):
+                    rf = get_readiness_poller().submit(result.token, result.filename)
+                    in_flight[rf] = (vehicle, ts, (result.finish, time.perf_counter()))
+                    waiting[vehicle] += 1
+                    continue
+
+                status, path = result
+                stats[vehicle][status] += 1
+                if on_result is not None:
+                    on_result(vehicle, ts, status, path)
+
+    return stats
+
+def pull_videos(token, vehicles, camera, start_ts, total_seconds, window_seconds=30, bucket_by_end=False, throttle_sec=None,
+                max_workers: int | None = None, per_vehicle_workers: int = PER_VEHICLE_WORKERS):
+    """
+    max_workers=None keeps the original one-slot-at-a-time loop; any integer
+    switches to run_slots_concurrently with that global worker bound.
+    Request pacing comes from RATE_LIMITER; throttle_sec adds a fixed pause
+    after every slot on top of it (e.g. THROTTLE_SEC for the old behaviour).
+    """
     if isinstance(vehicles, str):
         vehicles = [vehicles]
 
     end_ts = int(start_ts) + int(total_seconds)
-    stats = {v: {"saved": 0, "miss": 0, "skip": 0} for v in vehicles}
+    start_h = dt.datetime.fromtimestamp(start_ts, dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
+    end_h   = dt.datetime.fromtimestamp(end_ts,   dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
 
-    for vehicle in vehicles:
-        ts = int(start_ts)
-        start_h = dt.datetime.fromtimestamp(start_ts, dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
-        end_h   = dt.datetime.fromtimestamp(end_ts,   dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
-        print(f"\n=== {vehicle} | {camera} | {start_h}Z → {end_h}Z ===")
-
-        while ts < end_ts:
-            remaining = end_ts - ts
-            dur = int(min(window_seconds, remaining))
-            dur = max(1, min(30, dur))
-            fname, code = request_video_filename(token, vehicle, camera, ts, dur)
-            if fname:
-                bucket_ts = ts + (dur - 1 if bucket_by_end else 0)
-                day_str = dt.datetime.fromtimestamp(bucket_ts, DAY_TZ).strftime("%Y-%m-%d")
-                out_dir = out_dir_for(vehicle, day_str)
-                path = download_bag(token, fname, out_dir)
-                when = dt.datetime.fromtimestamp(ts, dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
-                if path:
-                    stats[vehicle]["saved"] += 1
-                    print(f"[OK]  {when}Z -> {_rel_out(path)}")
-                else:
-                    stats[vehicle]["skip"] += 1
-                    print(f"[SKIP] {when}Z {vehicle}: download failed")
-            else:
-                stats[vehicle]["miss"] += 1
-                when = dt.datetime.fromtimestamp(ts, dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
-                print(f"[MISS] {when}Z {vehicle} (code={code})")
-            ts += dur
+    defer_ready = max_workers is not None and ASYNC_READINESS
+
+    def work(vehicle, ts, dur):
+        bucket_ts = ts + (dur - 1 if bucket_by_end else 0)
+        result = _process_slot(token, vehicle, camera, ts, dur, bucket_ts=bucket_ts,
+                               defer_ready=defer_ready)
+        if throttle_sec:
             time.sleep(throttle_sec)
+        return result
+
+    def on_result(vehicle, ts, status, path):
+        METRICS.count(status, vehicle=vehicle)
+        if status == "saved":
+            when = dt.datetime.fromtimestamp(ts, dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"[OK]  {when}Z -> {_rel_out(path)}")
+
+    METRICS.reset()
+    _sweep_cas_before_run()
+    if max_workers is not None:
+        print(f"\n=== {len(vehicles)} vehicle(s) | {camera} | {start_h}Z → {end_h}Z "
+              f"| workers={max_workers} per-vehicle={per_vehicle_workers} ===")
+        slots = {v: _slot_range(start_ts, end_ts, window_seconds) for v in vehicles}
+        stats = run_slots_concurrently(work, slots, max_workers=max_workers,
+                                       per_vehicle_workers=per_vehicle_workers,
+                                       on_result=on_result)
+    else:
+        stats = {v: {"saved": 0, "miss": 0, "skip": 0} for v in vehicles}
+        for vehicle in vehicles:
+            print(f"\n=== {vehicle} | {camera} | {start_h}Z → {end_h}Z ===")
+            for ts, dur in _slot_range(start_ts, end_ts, window_seconds):
+                status, path = work(vehicle, ts, dur)
+                stats[vehicle][status] += 1
+                on_result(vehicle, ts, status, path)
+    print("\n" + METRICS.summary())
     return stats
 
 def midnight_utc_ts():
@@ -328,6 +1552,7 @@ def grab_first_n_per_vehicle(token, vehicles):
     start_ts, end_ts = batch_scan_window(LOOKBACK_S, DURATION_SECONDS)
 
     for vehicle in vehicles:
+        _CURRENT_VEHICLE.set(vehicle)
         print(f"\n=== {vehicle} | {CAMERA} | scanning {dt.datetime.fromtimestamp(start_ts, dt.UTC):%Y-%m-%d %H:%M:%S}Z → {dt.datetime.fromtimestamp(end_ts, dt.UTC):%Y-%m-%d %H:%M:%S}Z ===")
         saved = 0
         ts = start_ts
@@ -347,16 +1572,8 @@ def grab_first_n_per_vehicle(token, vehicles):
                 ts += DURATION_SECONDS
             else:
                 ts += SKIP_ON_404_SEC if code == 404 else DURATION_SECONDS
-                time.sleep(THROTTLE_SEC)
         print(f"[DONE] {vehicle}: saved {saved} file(s).")
 
-def looks_like_url_file(path: Path) -> bool:
-    try:
-        head = path.open("rb").read(32)
-        return head.startswith(b"http://") or head.startswith(b"https://")
-    except Exception:
-        return False
-
 def grab_random_clips(token, vehicles, num_trials=10, duration=DURATION_SECONDS):
     if isinstance(vehicles, str):
         vehicles = [vehicles]
@@ -364,6 +1581,7 @@ def grab_random_clips(token, vehicles, num_trials=10, duration=DURATION_SECONDS)
     start_ts, end_ts = batch_scan_window(LOOKBACK_S, duration)
 
     for vehicle in vehicles:
+        _CURRENT_VEHICLE.set(vehicle)
         print(f"\n=== {vehicle} random trials ({num_trials}) ===")
         saved = 0
         for trial in range(num_trials):
@@ -380,8 +1598,8 @@ def grab_random_clips(token, vehicles, num_trials=10, duration=DURATION_SECONDS)
             path = download_bag(token, fname, out_dir)
 
             if path:
-                sz = path.stat().st_size
-                if sz < 1_000_000: 
+                sz = bag_info(path, need_sha=False).size
+                if sz < MIN_VALID_BYTES:
                     print(f"[WARN] {when}Z {vehicle} got tiny file ({sz} bytes) – retrying.")
                 else:
                     saved += 1
@@ -390,8 +1608,6 @@ def grab_random_clips(token, vehicles, num_trials=10, duration=DURATION_SECONDS)
             else:
                 print(f"[FAIL] {when}Z {vehicle} download failed")
 
-            time.sleep(THROTTLE_SEC)
-
         print(f"[DONE] {vehicle}: {saved} valid bag(s) downloaded.")
 
 def day_bounds_utc(year: int, month: int, day: int) -> tuple[int, int]:
@@ -401,59 +1617,77 @@ def day_bounds_utc(year: int, month: int, day: int) -> tuple[int, int]:
     return start_ts, end_ts
 
 
+def _grab_slots(token, vehicles, camera, start_ts, end_ts, cap,
+                max_workers, per_vehicle_workers):
+    """
+    Shared driver for grab_whole_day / grab_window: 30 s slots named with
+    timeslot_filename, tiny files counted as SKIP, optional per-vehicle cap.
+    """
+    saved_so_far = {v: 0 for v in vehicles}
+    defer_ready = max_workers is not None and ASYNC_READINESS
+
+    def work(vehicle, ts, dur):
+        final_name = timeslot_filename(vehicle, camera, ts, dur)
+        return _process_slot(token, vehicle, camera, ts, dur,
+                             final_filename=final_name,
+                             min_valid_bytes=MIN_VALID_BYTES,
+                             defer_ready=defer_ready)
+
+    def on_result(vehicle, ts, status, path):
+        METRICS.count(status, vehicle=vehicle)
+        if status != "saved":
+            return
+        saved_so_far[vehicle] += 1
+        saved = saved_so_far[vehicle]
+        when = dt.datetime.fromtimestamp(ts, dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
+        sz = bag_info(path, need_sha=False).size
+        cap_str = f" ({saved}/{cap})" if cap else ""
+        print(f"[OK]  {when}Z -> {_rel_out(path)} (size={sz/1e6:.1f} MB){cap_str}")
+
+    def slots():
+        for ts in range(start_ts, end_ts, DURATION_SECONDS):
+            yield ts, DURATION_SECONDS
+
+    METRICS.reset()
+    _sweep_cas_before_run()
+    if max_workers is not None:
+        stats = run_slots_concurrently(work, {v: slots() for v in vehicles},
+                                       max_workers=max_workers,
+                                       per_vehicle_workers=per_vehicle_workers,
+                                       cap=cap, on_result=on_result)
+    else:
+        stats = {}
+        for vehicle in vehicles:
+            stats[vehicle] = {"saved": 0, "miss": 0, "skip": 0}
+            for ts, dur in slots():
+                if cap is not None and stats[vehicle]["saved"] >= cap:
+                    break
+                status, path = work(vehicle, ts, dur)
+                stats[vehicle][status] += 1
+                on_result(vehicle, ts, status, path)
+    print("\n" + METRICS.summary())
+    return stats
+
+
 def grab_whole_day(token: str, vehicles, camera: str,
                    year: int, month: int, day: int,
-                   max_files_per_vehicle: int | None = None):
+                   max_files_per_vehicle: int | None = None,
+                   max_workers: int | None = None,
+                   per_vehicle_workers: int = PER_VEHICLE_WORKERS):
     if isinstance(vehicles, str):
         vehicles = [vehicles]
 
     start_ts, end_ts = day_bounds_utc(year, month, day)
-    total_seconds = end_ts - start_ts
     today_start = int(dt.datetime.now(dt.UTC).replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
     if start_ts >= today_start:
         raise ValueError("That day is 'today' in UTC. The batch API requires using the realtime API for the current day.")
 
-    cap = max_files_per_vehicle
     print(f"\n=== WHOLE DAY {year:04d}-{month:02d}-{day:02d} UTC ===")
     print(f"Window: {dt.datetime.fromtimestamp(start_ts, dt.UTC):%Y-%m-%d %H:%M:%S}Z"
           f" → {dt.datetime.fromtimestamp(end_ts, dt.UTC):%Y-%m-%d %H:%M:%S}Z")
 
-    stats = {}
-    for vehicle in vehicles:
-        saved = 0
-        ts = start_ts
-        stats[vehicle] = {"saved": 0, "miss": 0, "skip": 0}
-        while ts < end_ts and (cap is None or saved < cap):
-            fname, code = request_video_filename(token, vehicle, camera, ts, DURATION_SECONDS)
-            when = dt.datetime.fromtimestamp(ts, dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
-            if fname:
-                day_str = dt.datetime.fromtimestamp(ts, DAY_TZ).strftime("%Y-%m-%d")
-                out_dir = out_dir_for(vehicle, day_str)
-                final_name = timeslot_filename(vehicle, camera, ts, DURATION_SECONDS)
-                path = download_bag(token, fname, out_dir, final_filename=final_name)
-
-                if not path:
-                    stats[vehicle]["skip"] += 1
-                    print(f"[SKIP] {when}Z {vehicle}: download failed")
-                else:
-                    sz = path.stat().st_size
-                    if sz < MIN_VALID_BYTES:
-                        try: path.unlink()
-                        except Exception: pass
-                        stats[vehicle]["skip"] += 1
-                        print(f"[WARN] {when}Z {vehicle} tiny file ({sz} bytes) – counted as SKIP")
-                    else:
-                        saved += 1
-                        stats[vehicle]["saved"] += 1
-                        cap_str = f" ({saved}/{cap})" if cap else ""
-                        print(f"[OK]  {when}Z -> {_rel_out(path)} (size={sz/1e6:.1f} MB){cap_str}")
-            else:
-                stats[vehicle]["miss"] += 1
-                print(f"[MISS] {when}Z {vehicle} (code={code})")
-
-            ts += DURATION_SECONDS
-
-    return stats
+    return _grab_slots(token, vehicles, camera, start_ts, end_ts,
+                       max_files_per_vehicle, max_workers, per_vehicle_workers)
 
 def timeslot_filename(vehicle: str, camera: str, start_ts: int, dur_s: int) -> str:
     t = dt.datetime.fromtimestamp(start_ts, dt.UTC)
@@ -474,7 +1708,9 @@ def grab_window(token: str, vehicles, camera: str,
                 year: int, month: int, day: int,
                 start_hour: int = 0, start_minute: int = 0,
                 duration_hours: int = 12, duration_minutes: int = 0,
-                max_files_per_vehicle: int | None = None):
+                max_files_per_vehicle: int | None = None,
+                max_workers: int | None = None,
+                per_vehicle_workers: int = PER_VEHICLE_WORKERS):
     if isinstance(vehicles, str):
         vehicles = [vehicles]
 
@@ -483,40 +1719,8 @@ def grab_window(token: str, vehicles, camera: str,
         start_hour=start_hour, start_minute=start_minute,
         duration_hours=duration_hours, duration_minutes=duration_minutes
     )
-    cap = max_files_per_vehicle
-    stats = {}
-    for vehicle in vehicles:
-        saved = 0
-        ts = start_ts
-        stats[vehicle] = {"saved": 0, "miss": 0, "skip": 0}
-        while ts < end_ts and (cap is None or saved < cap):
-            fname, code = request_video_filename(token, vehicle, camera, ts, DURATION_SECONDS)
-            when = dt.datetime.fromtimestamp(ts, dt.UTC).strftime("%Y-%m-%d %H:%M:%S")
-            if fname:
-                day_str = dt.datetime.fromtimestamp(ts, dt.UTC).strftime("%Y-%m-%d")
-                out_dir = out_dir_for(vehicle, day_str)
-                final_name = f"{vehicle}_{camera}_{dt.datetime.fromtimestamp(ts, dt.UTC):%Y-%m-%dT%H-%M-%SZ}_{DURATION_SECONDS}s.bag"
-                path = download_bag(token, fname, out_dir, final_filename=final_name)
-                if not path:
-                    stats[vehicle]["skip"] += 1
-                    print(f"[SKIP] {when}Z {vehicle}: download failed")
-                else:
-                    sz = path.stat().st_size
-                    if sz < MIN_VALID_BYTES:
-                        try: path.unlink()
-                        except Exception: pass
-                        stats[vehicle]["skip"] += 1
-                        print(f"[WARN] {when}Z {vehicle} tiny file ({sz} bytes) – counted as SKIP")
-                    else:
-                        saved += 1
-                        stats[vehicle]["saved"] += 1
-                        cap_str = f" ({saved}/{cap})" if cap else ""
-                        print(f"[OK]  {when}Z -> {_rel_out(path)} (size={sz/1e6:.1f} MB){cap_str}")
-            else:
-                stats[vehicle]["miss"] += 1
-                print(f"[MISS] {when}Z {vehicle} (code={code})")
-            ts += DURATION_SECONDS
-    return stats
+    return _grab_slots(token, vehicles, camera, start_ts, end_ts,
+                       max_files_per_vehicle, max_workers, per_vehicle_workers)
 
 def scan_availability(token: str,
                       vehicle: str,
@@ -547,7 +1751,15 @@ def scan_availability(token: str,
         else:
             ts += dur
 
-    # compress into contiguous availability segments
+    return samples, _segments_from_samples(samples, window_seconds, end_ts)
+
+
+def _segments_from_samples(samples, window_seconds, end_ts):
+    """
+    Compress time-ordered samples into contiguous availability segments.
+    A segment ends one window after the last has-video sample that precedes
+    a no-video sample.
+    """
     segments = []
     seg_start = None
     prev_ts = None
@@ -565,7 +1777,63 @@ def scan_availability(token: str,
     if seg_start is not None:
         segments.append((seg_start, end_ts))
 
-    return samples, segments
+    return segments
+
+
+def scan_availability_adaptive(token: str,
+                               vehicle: str,
+                               camera: str,
+                               start_ts: int,
+                               end_ts: int,
+                               window_seconds: int = DURATION_SECONDS,
+                               coarse_seconds: int = SCAN_COARSE_SEC):
+    """
+    Coarse-to-fine version of scan_availability.
+    1) probe every coarse_seconds (rounded to whole windows) plus the last window
+    2) wherever two neighbouring coarse probes disagree, bisect between them
+       until the has-video / no-video boundary is pinned to one window
+    Segments shorter than coarse_seconds that start and end between two
+    coarse probes in the same state are not seen.
+    Returns the same (samples, segments) as scan_availability; samples only
+    holds the windows actually probed, so len(samples) is the probe count.
+    """
+    start_ts, end_ts = int(start_ts), int(end_ts)
+    n = -(-(end_ts - start_ts) // window_seconds)
+    if n <= 0:
+        return [], []
+
+    probed = {}
+
+    def probe(i):
+        if i not in probed:
+            ts = start_ts + i * window_seconds
+            dur = max(1, min(30, window_seconds, end_ts - ts))
+            fname, code = request_video_filename(token, vehicle, camera, ts, dur)
+            probed[i] = (fname is not None, code)
+        return probed[i][0]
+
+    stride = max(1, coarse_seconds // window_seconds)
+    coarse = list(range(0, n, stride))
+    if coarse[-1] != n - 1:
+        coarse.append(n - 1)
+    for i in coarse:
+        probe(i)
+
+    for a, b in zip(coarse, coarse[1:]):
+        lo, hi = a, b
+        if probe(lo) == probe(hi):
+            continue
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if probe(mid) == probe(a):
+                lo = mid
+            else:
+                hi = mid
+
+    samples = [(start_ts + i * window_seconds, has, code)
+               for i, (has, code) in sorted(probed.items())]
+    print(f"[SCAN] {vehicle} {camera}: {len(samples)} probes for {n} windows")
+    return samples, _segments_from_samples(samples, window_seconds, end_ts)
 
 
 def visualize_availability(samples, title: str = ""):
@@ -638,7 +1906,7 @@ if __name__ == "__main__":
 
     for vehicle in vehicles:
         print(f"\n========== {vehicle} | {camera} ==========")
-        samples, segments = scan_availability(
+        samples, segments = scan_availability_adaptive(
             token,
             vehicle,
             camera,